@@ -0,0 +1,208 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+DESCRIPTION = """
+Compares the mongoengine based `repo` with the pure pymongo `pymongo_repo` and the embedded
+`sqlite_repo`:
+
+- import time of each module, measured in fresh interpreters,
+- client side overhead of building a query (mongoengine queryset compilation against a
+  prebuilt query document), which needs no MongoDB server,
+- the end to end latency of `get_wind_data` on the sample reports of `tests/static`, for
+  `sqlite_repo` on a temporary file and, with --db, for the MongoDB backends on a local mongod.
+  The --db database must not exist yet, as it is dropped at the end.
+
+    python -m benchmarks.backends [--db met-update-bench]
+"""
+
+static_dir = Path(__file__).parent.parent.joinpath('tests').joinpath('static')
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+
+def measure_import_ms(module: str, runs: int) -> float:
+    timings = [
+        float(subprocess.check_output([sys.executable, '-c', IMPORT_SNIPPET.format(module=module)]))
+        for _ in range(runs)
+    ]
+
+    return statistics.median(timings) * 1000
+
+
+def measure_query_building_us(number: int) -> dict[str, float]:
+    from mongoengine import QuerySet
+    from met_update_db import repo, pymongo_repo
+    from met_update_db.orm import Taf, Metar
+
+    before_timestamp = 1647612003
+
+    # querysets without collection, so that no server is needed to compile them
+    candidates = {
+        'repo (mongoengine queryset)': lambda: (
+            QuerySet(Metar, None)(repo._metar_query('EHAM', before_timestamp))
+            .order_by('-created_at')._query,
+            QuerySet(Taf, None)(repo._taf_query('EHAM', before_timestamp))
+            .order_by('-created_at')._query
+        ),
+        'pymongo_repo (query document)': lambda: (
+            pymongo_repo._metar_filter('EHAM', before_timestamp),
+            pymongo_repo._taf_filter('EHAM', before_timestamp)
+        ),
+    }
+
+    return {
+        name: min(timeit.repeat(candidate, number=number, repeat=5)) / number * 1e6
+        for name, candidate in candidates.items()
+    }
+
+
+def _sample_reports() -> tuple[list[dict], list[dict]]:
+    return (
+        [json.loads(path.read_text()) for path in static_dir.glob('metar/*/*.json')],
+        [json.loads(path.read_text()) for path in static_dir.glob('taf/*/*.json')],
+    )
+
+
+def _measure_lookups_us(get_wind_data, metars: list[dict], number: int) -> float:
+    from met_update_db.utils import datetime_from_string
+    from met_update_db.wind import METNotAvailable
+
+    timestamps = [
+        int(datetime_from_string(metar_data['time']['dt']).timestamp()) + 3600
+        for metar_data in metars
+    ]
+
+    def run():
+        for before_timestamp in timestamps:
+            try:
+                get_wind_data('EHAM', before_timestamp)
+            except METNotAvailable:
+                pass
+
+    return min(timeit.repeat(run, number=number, repeat=5)) / number / len(timestamps) * 1e6
+
+
+def measure_mongo_get_wind_data_us(db: str, host: str, port: int, number: int) -> dict[str, float]:
+    from mongoengine import connect, connection
+    from met_update_db import repo, pymongo_repo
+
+    connect(db=db, host=host, port=port)
+    # the database is dropped at the end
+    if connection.get_db().list_collection_names():
+        raise ValueError(f"the {db} database is not empty, use a new one")
+
+    pymongo_repo.use_database(connection.get_db())
+
+    metars, tafs = _sample_reports()
+    for metar_data in metars:
+        repo.add_metar(metar_data, 'EHAM')
+    for taf_data in tafs:
+        repo.add_taf(taf_data, 'EHAM')
+
+    try:
+        return {
+            'repo': _measure_lookups_us(repo.get_wind_data, metars, number),
+            'pymongo_repo': _measure_lookups_us(pymongo_repo.get_wind_data, metars, number),
+        }
+    finally:
+        connection.get_db().client.drop_database(db)
+
+
+def measure_sqlite_get_wind_data_us(number: int) -> dict[str, float]:
+    from met_update_db import sqlite_repo
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sqlite_repo.connect(Path(tmp_dir) / 'met-update.db')
+
+        metars, tafs = _sample_reports()
+        for metar_data in metars:
+            sqlite_repo.add_metar(metar_data, 'EHAM')
+        for taf_data in tafs:
+            sqlite_repo.add_taf(taf_data, 'EHAM')
+
+        try:
+            return {'sqlite_repo': _measure_lookups_us(sqlite_repo.get_wind_data, metars, number)}
+        finally:
+            sqlite_repo.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=DESCRIPTION,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--import-runs', type=int, default=10)
+    parser.add_argument('--number', type=int, default=2000)
+    parser.add_argument('--db', help='run the end to end benchmark against this new database')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=27017)
+    args = parser.parse_args()
+
+    print('import time (median)')
+    for module in ('met_update_db.repo', 'met_update_db.pymongo_repo'):
+        print(f"  {module:<32} {measure_import_ms(module, args.import_runs):8.1f} ms")
+
+    print('query building (METAR + TAF)')
+    for name, us in measure_query_building_us(args.number).items():
+        print(f"  {name:<32} {us:8.1f} us")
+
+    print('get_wind_data (per lookup)')
+    results = measure_sqlite_get_wind_data_us(max(1, args.number // 100))
+    if args.db:
+        try:
+            results.update(measure_mongo_get_wind_data_us(args.db, args.host, args.port,
+                                                          max(1, args.number // 100)))
+        except ValueError as e:
+            parser.error(str(e))
+    for name, us in results.items():
+        print(f"  {name:<32} {us:8.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import argparse
+import json
+import timeit
+import tracemalloc
+import uuid
+from pathlib import Path
+from typing import Callable
+
+from met_update_db import orm
+from met_update_db.read_models import TafRecord, MetarRecord, TAF_RECORD_FIELDS, \
+    METAR_RECORD_FIELDS
+from met_update_db.utils import datetime_from_string, datetime_from_string_with_ms
+
+DESCRIPTION = """
+Compares the per-document cost of hydrating raw MongoDB documents into mongoengine `Document`s
+against building the lightweight read models of `met_update_db.read_models`.
+
+The raw documents are produced offline from the sample reports of `tests/static`, so no MongoDB
+server is needed.
+
+    python -m benchmarks.hydration --copies 2000
+"""
+
+static_dir = Path(__file__).parent.parent.joinpath('tests').joinpath('static')
+
+
+def _load_reports(report_type: str) -> list[dict]:
+    return [
+        json.loads(path.read_text())
+        for path in sorted(static_dir.joinpath(report_type).glob('*/*.json'))
+    ]
+
+
+def _taf_docs(copies: int) -> list[dict]:
+    return [
+        orm.Taf(
+            id=uuid.uuid4().hex,
+            airport_icao=taf_data['station'],
+            content=taf_data,
+            start_time=datetime_from_string(taf_data['start_time']['dt']),
+            end_time=datetime_from_string(taf_data['end_time']['dt']),
+            created_at=datetime_from_string_with_ms(taf_data['meta']['timestamp'])
+        ).to_mongo().to_dict()
+        for _ in range(copies)
+        for taf_data in _load_reports('taf')
+    ]
+
+
+def _metar_docs(copies: int) -> list[dict]:
+    return [
+        orm.Metar(
+            id=uuid.uuid4().hex,
+            airport_icao=metar_data['station'],
+            content=metar_data,
+            time=datetime_from_string(metar_data['time']['dt']),
+            created_at=datetime_from_string_with_ms(metar_data['meta']['timestamp'])
+        ).to_mongo().to_dict()
+        for _ in range(copies)
+        for metar_data in _load_reports('metar')
+    ]
+
+
+def _measure(docs: list[dict], hydrate: Callable[[dict], object], repeat: int) -> tuple[float, float]:
+    """
+    Returns the best time (in microseconds) and the retained memory (in bytes) per document
+    """
+    best_seconds = min(timeit.repeat(lambda: [hydrate(doc) for doc in docs], number=1, repeat=repeat))
+
+    tracemalloc.start()
+    hydrated = [hydrate(doc) for doc in docs]
+    retained_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del hydrated
+
+    return best_seconds / len(docs) * 1e6, retained_bytes / len(docs)
+
+
+def _report(name: str, docs: list[dict], candidates: dict[str, Callable[[dict], object]], repeat: int):
+    print(f"{name} ({len(docs)} documents)")
+
+    baseline_us, baseline_bytes = None, None
+    for label, hydrate in candidates.items():
+        per_doc_us, per_doc_bytes = _measure(docs, hydrate, repeat)
+
+        if baseline_us is None:
+            baseline_us, baseline_bytes = per_doc_us, per_doc_bytes
+            savings = ''
+        else:
+            savings = f"  saves {baseline_us - per_doc_us:8.2f} us, {baseline_bytes - per_doc_bytes:8.0f} B"
+
+        print(f"  {label:<28} {per_doc_us:8.2f} us/doc {per_doc_bytes:8.0f} B/doc{savings}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=DESCRIPTION,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--copies', type=int, default=1000,
+                        help='number of copies of each sample report')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    _report('TAF', _taf_docs(args.copies), {
+        'orm.Taf': orm.Taf._from_son,
+        'TafRecord (all fields)': lambda doc: TafRecord.from_mongo(doc, TAF_RECORD_FIELDS),
+        'TafRecord (content)': lambda doc: TafRecord.from_mongo(doc, ('content',)),
+    }, args.repeat)
+
+    _report('METAR', _metar_docs(args.copies), {
+        'orm.Metar': orm.Metar._from_son,
+        'MetarRecord (all fields)': lambda doc: MetarRecord.from_mongo(doc, METAR_RECORD_FIELDS),
+        'MetarRecord (content)': lambda doc: MetarRecord.from_mongo(doc, ('content',)),
+    }, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import argparse
+import copy
+import datetime
+import json
+import random
+import statistics
+import string
+import sys
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+
+from mongoengine import connect, connection
+
+from met_update_db import repo
+
+DESCRIPTION = """
+Mixed read/write load test against a local mongod.
+
+Concurrent readers call `repo.get_wind_data` for random airports while an ingester writes
+METARs and TAFs for the same airports at production cadence (optionally accelerated and with
+periodic ingest bursts). Throughput and p50/p95/p99 read latency are reported per time window
+and overall; the overall figures can be stored as a baseline and compared against on later
+runs, in which case the exit code is 1 on regression. The `--db` database must not exist yet, as
+it is dropped at the end of the run unless `--keep-db` is given.
+
+    python -m benchmarks.load_test --airports 200 --readers 16 --duration 120 \
+        --time-scale 60 --burst-every 30 --burst-size 500 --baseline baseline.json
+"""
+
+static_dir = Path(__file__).parent.parent.joinpath('tests').joinpath('static')
+
+DT_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+DT_WITH_MS_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+
+def _load_templates(report_type: str) -> list[dict]:
+    return [
+        json.loads(path.read_text())
+        for path in sorted(static_dir.joinpath(report_type).glob('*/*.json'))
+    ]
+
+
+def _shift_dt_values(data, delta: datetime.timedelta):
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key == 'dt' and isinstance(value, str):
+                shifted = datetime.datetime.strptime(value, DT_FORMAT) + delta
+                data[key] = shifted.strftime(DT_FORMAT)
+            else:
+                _shift_dt_values(value, delta)
+    elif isinstance(data, list):
+        for item in data:
+            _shift_dt_values(item, delta)
+
+
+def _make_report(template: dict, airport_icao: str, created_at: datetime.datetime) -> dict:
+    """
+    Copies `template` for `airport_icao`, shifting all of its times so that it is created at
+    `created_at`
+    """
+    report = copy.deepcopy(template)
+    template_created_at = datetime.datetime.strptime(template['meta']['timestamp'],
+                                                     DT_WITH_MS_FORMAT)
+
+    _shift_dt_values(report, created_at - template_created_at)
+    report['meta']['timestamp'] = created_at.strftime(DT_WITH_MS_FORMAT)
+    report['station'] = airport_icao
+
+    return report
+
+
+def _airports(count: int) -> list[str]:
+    rnd = random.Random(0)
+    return ['X' + ''.join(rnd.choices(string.ascii_uppercase, k=3)) for _ in range(count)]
+
+
+@dataclass
+class Stats:
+    read_latencies_ms: list[float] = field(default_factory=list)
+    writes: int = 0
+
+
+@dataclass
+class Summary:
+    reads_per_second: float
+    writes_per_second: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+    @classmethod
+    def from_stats(cls, stats: Stats, seconds: float) -> "Summary":
+        latencies = stats.read_latencies_ms
+        if len(latencies) >= 2:
+            quantiles = statistics.quantiles(latencies, n=100)
+            p50, p95, p99 = quantiles[49], quantiles[94], quantiles[98]
+        else:
+            p50 = p95 = p99 = latencies[0] if latencies else float('nan')
+
+        return cls(
+            reads_per_second=len(latencies) / seconds,
+            writes_per_second=stats.writes / seconds,
+            p50_ms=p50,
+            p95_ms=p95,
+            p99_ms=p99
+        )
+
+    def __str__(self):
+        return f"reads/s {self.reads_per_second:9.1f} | writes/s {self.writes_per_second:8.1f} | " \
+               f"p50 {self.p50_ms:7.2f}ms | p95 {self.p95_ms:7.2f}ms | p99 {self.p99_ms:7.2f}ms"
+
+
+class LoadTest:
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.airports = _airports(args.airports)
+        self.metar_templates = _load_templates('metar')
+        self.taf_templates = _load_templates('taf')
+
+        self.start = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.windows: dict[int, Stats] = defaultdict(Stats)
+        self.burst_windows: set[int] = set()
+
+    def _window(self) -> int:
+        return int((time.monotonic() - self.start) // self.args.interval)
+
+    def _add_metar(self, airport_icao: str, created_at: datetime.datetime):
+        repo.add_metar(_make_report(random.choice(self.metar_templates), airport_icao, created_at),
+                       airport_icao)
+
+    def _add_taf(self, airport_icao: str, created_at: datetime.datetime):
+        repo.add_taf(_make_report(random.choice(self.taf_templates), airport_icao, created_at),
+                     airport_icao)
+
+    def seed(self):
+        now = datetime.datetime.utcnow()
+
+        for airport_icao in self.airports:
+            for hours_ago in range(self.args.history_hours, 0, -1):
+                created_at = now - datetime.timedelta(hours=hours_ago)
+                self._add_metar(airport_icao, created_at)
+                self._add_metar(airport_icao, created_at + datetime.timedelta(minutes=30))
+                if hours_ago % 6 == 0:
+                    self._add_taf(airport_icao, created_at)
+
+    def _record_write(self):
+        with self.lock:
+            self.windows[self._window()].writes += 1
+
+    def reader(self):
+        rnd = random.Random()
+
+        while not self.stop_event.is_set():
+            airport_icao = rnd.choice(self.airports)
+            before_timestamp = int(datetime.datetime.utcnow().timestamp()) \
+                - rnd.randint(0, self.args.lookback_seconds)
+
+            start = time.perf_counter()
+            try:
+                repo.get_wind_data(airport_icao, before_timestamp)
+            except repo.METNotAvailable:
+                pass
+            latency_ms = (time.perf_counter() - start) * 1000
+
+            with self.lock:
+                self.windows[self._window()].read_latencies_ms.append(latency_ms)
+
+    def ingester(self):
+        # production cadence is a METAR every 30 minutes and a TAF every 6 hours per airport
+        metar_period = 30 * 60 / self.args.time_scale / len(self.airports)
+        taf_period = 6 * 60 * 60 / self.args.time_scale / len(self.airports)
+        next_metar, next_taf = time.monotonic(), time.monotonic()
+        next_burst = time.monotonic() + self.args.burst_every if self.args.burst_every else None
+
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+
+            if next_burst is not None and now >= next_burst:
+                self.burst_windows.add(self._window())
+                for _ in range(self.args.burst_size):
+                    self._add_metar(random.choice(self.airports), datetime.datetime.utcnow())
+                    self._record_write()
+                next_burst += self.args.burst_every
+
+            if now >= next_metar:
+                self._add_metar(random.choice(self.airports), datetime.datetime.utcnow())
+                self._record_write()
+                next_metar += metar_period
+
+            if now >= next_taf:
+                self._add_taf(random.choice(self.airports), datetime.datetime.utcnow())
+                self._record_write()
+                next_taf += taf_period
+
+            next_event = min(next_metar, next_taf, next_burst or float('inf'))
+            time.sleep(max(0., next_event - time.monotonic()))
+
+    def run(self) -> Summary:
+        threads = [threading.Thread(target=self.reader) for _ in range(self.args.readers)]
+        if not self.args.no_ingest:
+            threads.append(threading.Thread(target=self.ingester))
+
+        self.start = time.monotonic()
+        for thread in threads:
+            thread.start()
+
+        reported = 0
+        while time.monotonic() - self.start < self.args.duration:
+            time.sleep(self.args.interval)
+            current = self._window()
+            for window in range(reported, current):
+                self._print_window(window)
+            reported = current
+
+        self.stop_event.set()
+        for thread in threads:
+            thread.join()
+
+        total = Stats()
+        for stats in self.windows.values():
+            total.read_latencies_ms.extend(stats.read_latencies_ms)
+            total.writes += stats.writes
+
+        return Summary.from_stats(total, time.monotonic() - self.start)
+
+    def _print_window(self, window: int):
+        with self.lock:
+            stats = copy.deepcopy(self.windows[window])
+
+        burst = ' (ingest burst)' if window in self.burst_windows else ''
+        print(f"[{window * self.args.interval:6.0f}s] "
+              f"{Summary.from_stats(stats, self.args.interval)}{burst}")
+
+
+def find_regressions(summary: Summary, baseline: Summary, tolerance: float) -> list[str]:
+    regressions = []
+
+    if summary.reads_per_second < baseline.reads_per_second * (1 - tolerance):
+        regressions.append(f"reads/s {summary.reads_per_second:.1f} < "
+                           f"baseline {baseline.reads_per_second:.1f}")
+
+    for name in ('p50_ms', 'p95_ms', 'p99_ms'):
+        value, baseline_value = getattr(summary, name), getattr(baseline, name)
+        if value > baseline_value * (1 + tolerance):
+            regressions.append(f"{name} {value:.2f} > baseline {baseline_value:.2f}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=DESCRIPTION,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default='met-update-load-test')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=27017)
+    parser.add_argument('--airports', type=int, default=100)
+    parser.add_argument('--history-hours', type=int, default=48,
+                        help='hours of METAR/TAF history seeded per airport')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--lookback-seconds', type=int, default=6 * 60 * 60,
+                        help='readers query random timestamps up to this far in the past')
+    parser.add_argument('--duration', type=float, default=60)
+    parser.add_argument('--interval', type=float, default=5, help='report window in seconds')
+    parser.add_argument('--time-scale', type=float, default=1.,
+                        help='speed up of the production ingest cadence')
+    parser.add_argument('--burst-every', type=float, default=0,
+                        help='seconds between ingest bursts, 0 disables them')
+    parser.add_argument('--burst-size', type=int, default=0, help='METARs written per burst')
+    parser.add_argument('--no-ingest', action='store_true')
+    parser.add_argument('--baseline', type=Path, help='baseline to compare against')
+    parser.add_argument('--save-baseline', type=Path, help='store the results as baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--keep-db', action='store_true',
+                        help='keep the database created for the run')
+    args = parser.parse_args()
+
+    connect(db=args.db, host=args.host, port=args.port)
+    # the database is dropped at the end, see `--keep-db`
+    if connection.get_db().list_collection_names():
+        parser.error(f"the {args.db} database is not empty, use a new one")
+
+    load_test = LoadTest(args)
+
+    try:
+        print(f"seeding {args.history_hours}h of history for {args.airports} airports")
+        load_test.seed()
+
+        summary = load_test.run()
+        print(f"[ overall] {summary}")
+    finally:
+        if not args.keep_db:
+            db = connection.get_db()
+            db.client.drop_database(db.name)
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(asdict(summary), indent=4))
+
+    if args.baseline:
+        baseline = Summary(**json.loads(args.baseline.read_text()))
+        regressions = find_regressions(summary, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
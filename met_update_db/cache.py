@@ -0,0 +1,161 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+@dataclass
+class NegativeCacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    stale_adds: int = 0
+
+
+class NegativeCache:
+    """
+    Remembers for `ttl_seconds` that no MET data is available for an airport at the requested
+    timestamp. The entries are exact: whether data is available changes at arbitrary times (e.g.
+    the end of the validity of a METAR or a TAF), so a miss says nothing about the neighbouring
+    timestamps. The entries of an airport are dropped as soon as new data for it is added, and
+    the least recently used ones are evicted beyond `maxsize`. It is disabled while
+    `ttl_seconds` is 0.
+
+    Every invalidation of an airport bumps its generation: a reader reads it before querying and
+    passes it to `add`, which drops the entry if new data was added meanwhile, since the result of
+    the queries may predate it.
+    """
+
+    def __init__(self, ttl_seconds: float = 0, maxsize: int = 10_000):
+        self._lock = threading.Lock()
+        # kept across `configure` so that they never go back
+        self._generations: dict[str, int] = {}
+        self.configure(ttl_seconds, maxsize)
+
+    def configure(self, ttl_seconds: float, maxsize: int = 10_000):
+        with self._lock:
+            self.ttl_seconds = ttl_seconds
+            self.maxsize = maxsize
+            self.stats = NegativeCacheStats()
+            self._expiries: OrderedDict[tuple[str, int], float] = OrderedDict()
+            self._timestamps_per_airport: dict[str, set[int]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _remove(self, key: tuple[str, int]):
+        del self._expiries[key]
+
+        airport_icao, before_timestamp = key
+        timestamps = self._timestamps_per_airport[airport_icao]
+        timestamps.discard(before_timestamp)
+        if not timestamps:
+            del self._timestamps_per_airport[airport_icao]
+
+    def contains(self, airport_icao: str, before_timestamp: int) -> bool:
+        if not self.enabled:
+            return False
+
+        key = airport_icao, before_timestamp
+
+        with self._lock:
+            expiry = self._expiries.get(key)
+
+            if expiry is None:
+                self.stats.misses += 1
+                return False
+
+            if expiry <= time.monotonic():
+                self._remove(key)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return False
+
+            self._expiries.move_to_end(key)
+            self.stats.hits += 1
+            return True
+
+    def generation(self, airport_icao: str) -> int:
+        return self._generations.get(airport_icao, 0)
+
+    def add(self, airport_icao: str, before_timestamp: int, generation: int | None = None):
+        """
+        Records the entry unless `generation` (as read before querying) is no longer the current
+        generation of the airport. It is recorded unconditionally if `generation` is None.
+        """
+        if not self.enabled:
+            return
+
+        key = airport_icao, before_timestamp
+
+        with self._lock:
+            if generation is not None and generation != self.generation(airport_icao):
+                self.stats.stale_adds += 1
+                return
+
+            self._expiries[key] = time.monotonic() + self.ttl_seconds
+            self._expiries.move_to_end(key)
+            self._timestamps_per_airport.setdefault(airport_icao, set()).add(before_timestamp)
+
+            while len(self._expiries) > self.maxsize:
+                self._remove(next(iter(self._expiries)))
+                self.stats.evictions += 1
+
+    def invalidate(self, airport_icao: str):
+        with self._lock:
+            self._generations[airport_icao] = self.generation(airport_icao) + 1
+
+            for before_timestamp in list(self._timestamps_per_airport.get(airport_icao, ())):
+                self._remove((airport_icao, before_timestamp))
+                self.stats.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._expiries.clear()
+            self._timestamps_per_airport.clear()
+
+    def __len__(self):
+        return len(self._expiries)
+
+
+negative_cache = NegativeCache()
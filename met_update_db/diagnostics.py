@@ -0,0 +1,178 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from bson import SON
+from mongoengine.queryset import QuerySet
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SlowQueryConfig:
+    # queries slower than this are reported
+    threshold_ms: float = 100.
+    # fraction of the queries that get timed at all
+    sample_rate: float = 1.
+    # upper limit of reported (and therefore explained) slow queries
+    max_reports_per_minute: int = 6
+
+
+class _RateLimiter:
+
+    def __init__(self, max_events: int, period_seconds: float):
+        self.max_events = max_events
+        self.period_seconds = period_seconds
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+
+        with self._lock:
+            while self._events and now - self._events[0] >= self.period_seconds:
+                self._events.popleft()
+
+            if len(self._events) >= self.max_events:
+                return False
+
+            self._events.append(now)
+            return True
+
+
+_config: SlowQueryConfig | None = None
+_rate_limiter: _RateLimiter | None = None
+
+
+def enable_slow_query_log(config: SlowQueryConfig | None = None):
+    global _config, _rate_limiter
+
+    _config = config or SlowQueryConfig()
+    _rate_limiter = _RateLimiter(max_events=_config.max_reports_per_minute, period_seconds=60)
+
+
+def disable_slow_query_log():
+    global _config, _rate_limiter
+
+    _config, _rate_limiter = None, None
+
+
+def _explain(queryset: QuerySet, limit: int | None) -> dict:
+    collection = queryset._collection
+
+    find = SON([('find', collection.name), ('filter', queryset._query)])
+    if queryset._ordering:
+        find['sort'] = SON(queryset._ordering)
+    if limit:
+        find['limit'] = limit
+
+    return collection.database.command('explain', find, verbosity='executionStats')
+
+
+def _plan_stages(plan: dict) -> list[str]:
+    stages = []
+
+    while plan:
+        stage = plan['stage']
+        if 'indexName' in plan:
+            stage = f"{stage}({plan['indexName']})"
+        stages.append(stage)
+
+        plan = plan.get('inputStage') or next(iter(plan.get('inputStages', [])), None)
+
+    return stages
+
+
+def _summarize_explain(explain: dict) -> dict:
+    winning_plan = explain['queryPlanner']['winningPlan']
+    execution_stats = explain['executionStats']
+
+    return {
+        'plan_stages': _plan_stages(winning_plan.get('queryPlan', winning_plan)),
+        'docs_examined': execution_stats['totalDocsExamined'],
+        'keys_examined': execution_stats['totalKeysExamined'],
+        'n_returned': execution_stats['nReturned'],
+        'execution_time_ms': execution_stats['executionTimeMillis'],
+    }
+
+
+def _report_slow_query(name: str, queryset: QuerySet, limit: int | None, duration_ms: float):
+    record = {
+        'query': name,
+        'collection': queryset._collection.name,
+        'filter': queryset._query,
+        'sort': queryset._ordering,
+        'limit': limit,
+        'duration_ms': round(duration_ms, 3),
+    }
+
+    try:
+        record.update(_summarize_explain(_explain(queryset, limit)))
+    except (PyMongoError, KeyError) as e:
+        record['explain_error'] = str(e)
+
+    logger.warning(f"slow query {name}: {duration_ms:.1f}ms", extra={'slow_query': record})
+
+
+@contextmanager
+def track_query(name: str, queryset: QuerySet, limit: int | None = None):
+    """
+    Times the block consuming `queryset` and, if it exceeds the configured threshold, logs the
+    `executionStats` of its explain as the `slow_query` attribute of the log record. The block
+    should run the find of `queryset` only, with `limit` if it reads a limited number of
+    documents through a clone of it (e.g. 1 for `first()`), since that is what gets explained.
+    """
+    config, rate_limiter = _config, _rate_limiter
+
+    if config is None or random.random() >= config.sample_rate:
+        yield
+        return
+
+    start = time.perf_counter()
+    yield
+    duration_ms = (time.perf_counter() - start) * 1000
+
+    if duration_ms >= config.threshold_ms and rate_limiter.acquire():
+        _report_slow_query(name, queryset, limit or queryset._limit, duration_ms)
@@ -0,0 +1,134 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterable
+
+from mongoengine import DEFAULT_CONNECTION_NAME
+from mongoengine.connection import get_connection
+
+from met_update_db import repo
+from met_update_db.wind import WindData, WindDataSource, METNotAvailable
+
+
+class WindLookupTimeout(Exception):
+
+    def __init__(self, airport_icao: str, before_timestamp: int):
+        super().__init__(f"wind lookup for {airport_icao} before {before_timestamp} timed out")
+        self.airport_icao = airport_icao
+        self.before_timestamp = before_timestamp
+
+
+def _lookup(airport_icao: str, before_timestamp: int) -> tuple[WindData, WindDataSource] | None:
+    try:
+        return repo.get_wind_data(airport_icao, before_timestamp)
+    except METNotAvailable:
+        return None
+
+
+class WindLookupExecutor:
+    # the workers share the pool of the mongoengine connection, so they are capped to its size
+    def __init__(self,
+                 max_workers: int | None = None,
+                 timeout: float | None = None,
+                 alias: str = DEFAULT_CONNECTION_NAME):
+        max_pool_size = get_connection(alias).options.pool_options.max_pool_size
+
+        self.max_workers = min(max_workers or max_pool_size, max_pool_size)
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='wind-lookup')
+
+    def get_wind_data(
+            self,
+            lookups: Iterable[tuple[str, int]]
+    ) -> list[tuple[WindData, WindDataSource] | None]:
+        """
+        Returns the results in the order of `lookups`, with `None` in place of the lookups that
+        raised `METNotAvailable`. Each lookup has `timeout` seconds to complete once a worker has
+        started it, so the lookups queued behind the others are not timed out meanwhile. Otherwise
+        the lookups not started yet are cancelled and `WindLookupTimeout` is raised. The lookups
+        already running are not interrupted: they complete in the background, holding their worker
+        and connection until then.
+        """
+        lookups = list(lookups)
+        # index of the lookup -> monotonic time its worker started it at
+        started_at = {}
+
+        def run(index: int, airport_icao: str, before_timestamp: int):
+            started_at[index] = time.monotonic()
+            return _lookup(airport_icao, before_timestamp)
+
+        futures = [
+            self._executor.submit(run, index, airport_icao, before_timestamp)
+            for index, (airport_icao, before_timestamp) in enumerate(lookups)
+        ]
+
+        pending = set(range(len(futures)))
+        while pending:
+            timeout = None
+            if self.timeout is not None:
+                now = time.monotonic()
+                deadlines = {index: started_at[index] + self.timeout
+                             for index in pending if index in started_at}
+
+                expired = [index for index, deadline in deadlines.items()
+                           if deadline <= now and not futures[index].done()]
+                if expired:
+                    for future in futures:
+                        future.cancel()
+                    raise WindLookupTimeout(*lookups[min(expired)])
+
+                # the lookups started meanwhile are seen a timeout later at most
+                timeout = min(list(deadlines.values()) + [now + self.timeout]) - now
+
+            done, _ = wait([futures[index] for index in pending],
+                           timeout=timeout,
+                           return_when=FIRST_COMPLETED)
+            pending -= {index for index in pending if futures[index] in done}
+
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
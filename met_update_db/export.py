@@ -0,0 +1,233 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+# Dense wind time series for model training.
+#
+# `export_wind_series` streams the METARs and TAFs of the requested range once and resolves the
+# wind at every step with the same rules as `repo.resolve_wind_data`: the most recently created
+# METAR observed within the last two hours has precedence over the most recently created TAF
+# which is valid at the step, in which case the forecast item covering the step (or the last
+# one with wind otherwise) provides the values.
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from met_update_db import repo
+from met_update_db.utils import datetime_from_string
+from met_update_db.wind import WindDataSource, _get_wind_value
+
+METAR_VALIDITY_SECONDS = 2 * 60 * 60
+
+NO_SOURCE = 0
+SOURCE_CODES = {
+    WindDataSource.METAR: 1,
+    WindDataSource.TAF: 2,
+}
+
+
+@dataclass
+class WindSeries:
+    timestamps: np.ndarray
+    direction: np.ndarray
+    speed: np.ndarray
+    # one of NO_SOURCE or SOURCE_CODES
+    source: np.ndarray
+
+    def save(self, path: str | Path):
+        np.savez(path,
+                 timestamps=self.timestamps,
+                 direction=self.direction,
+                 speed=self.speed,
+                 source=self.source)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "WindSeries":
+        with np.load(path) as data:
+            return cls(timestamps=data['timestamps'],
+                       direction=data['direction'],
+                       speed=data['speed'],
+                       source=data['source'])
+
+
+def _wind_value(content: dict, value_key: str) -> float:
+    value = _get_wind_value(content, value_key)
+
+    return np.nan if value is None else value
+
+
+def _paint_winners(steps: np.ndarray,
+                   eligible_from: np.ndarray,
+                   eligible_to: np.ndarray,
+                   created_at: np.ndarray) -> np.ndarray:
+    """
+    Returns for each step the index of the report created last among the ones eligible at it
+    (within [eligible_from, eligible_to]), or -1 if there is none. The reports are painted over
+    the steps in order of creation so that the later ones overwrite the earlier ones.
+    """
+    winners = np.full(steps.shape, -1, dtype=np.int64)
+
+    first_steps = np.searchsorted(steps, eligible_from, side='left')
+    last_steps = np.searchsorted(steps, eligible_to, side='right')
+
+    for index in np.argsort(created_at, kind='stable'):
+        winners[first_steps[index]:last_steps[index]] = index
+
+    return winners
+
+
+def _resolve_taf_values(steps: np.ndarray, forecast: list[dict], value_key: str) -> np.ndarray:
+    # vectorized `repo._get_taf_wind_value` over `steps`
+    items = [
+        (
+            datetime_from_string(item['start_time']['dt']).timestamp(),
+            datetime_from_string(item['end_time']['dt']).timestamp(),
+            value
+        )
+        for item in forecast
+        if (value := _get_wind_value(item, value_key)) is not None
+    ]
+
+    if not items:
+        return np.full(steps.shape, np.nan)
+
+    items_start, items_end, values = (np.array(column) for column in zip(*items))
+
+    covering = (items_start <= steps[:, None]) & (steps[:, None] <= items_end)
+    first_covering = covering.argmax(axis=1)
+
+    return np.where(covering.any(axis=1), values[first_covering], values[-1])
+
+
+def _metar_wind(airport_icao: str, steps: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    times, created_at, directions, speeds = [], [], [], []
+
+    for chunk in repo.iter_metars(airport_icao,
+                                  start_timestamp=int(steps[0]) - METAR_VALIDITY_SECONDS,
+                                  end_timestamp=int(steps[-1]) + 1,
+                                  fields=('time', 'created_at', 'content'),
+                                  chunk_size=1000):
+        for metar in chunk:
+            times.append(metar.time.timestamp())
+            created_at.append(metar.created_at.timestamp())
+            directions.append(_wind_value(metar.content, 'wind_direction'))
+            speeds.append(_wind_value(metar.content, 'wind_speed'))
+
+    direction = np.full(steps.shape, np.nan)
+    speed = np.full(steps.shape, np.nan)
+
+    if not times:
+        return direction, speed
+
+    times, created_at = np.array(times), np.array(created_at)
+    winners = _paint_winners(steps,
+                             eligible_from=np.maximum(times, created_at),
+                             eligible_to=times + METAR_VALIDITY_SECONDS,
+                             created_at=created_at)
+
+    resolved = winners >= 0
+    direction[resolved] = np.array(directions)[winners[resolved]]
+    speed[resolved] = np.array(speeds)[winners[resolved]]
+
+    return direction, speed
+
+
+def _taf_wind(airport_icao: str, steps: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    start_times, end_times, created_at, forecasts = [], [], [], []
+
+    for chunk in repo.iter_tafs(airport_icao,
+                                start_timestamp=int(steps[0]),
+                                end_timestamp=int(steps[-1]) + 1,
+                                fields=('start_time', 'end_time', 'created_at', 'content'),
+                                chunk_size=1000):
+        for taf in chunk:
+            start_times.append(taf.start_time.timestamp())
+            end_times.append(taf.end_time.timestamp())
+            created_at.append(taf.created_at.timestamp())
+            forecasts.append(taf.content.get('forecast', []))
+
+    direction = np.full(steps.shape, np.nan)
+    speed = np.full(steps.shape, np.nan)
+
+    if not forecasts:
+        return direction, speed
+
+    created_at = np.array(created_at)
+    winners = _paint_winners(steps,
+                             eligible_from=np.maximum(np.array(start_times), created_at),
+                             eligible_to=np.array(end_times),
+                             created_at=created_at)
+
+    for index in np.unique(winners[winners >= 0]):
+        won = winners == index
+        direction[won] = _resolve_taf_values(steps[won], forecasts[index], 'wind_direction')
+        speed[won] = _resolve_taf_values(steps[won], forecasts[index], 'wind_speed')
+
+    return direction, speed
+
+
+def export_wind_series(airport_icao: str,
+                       start_timestamp: int,
+                       end_timestamp: int,
+                       step_seconds: int) -> WindSeries:
+    """
+    Resolves the wind at every step within [start_timestamp, end_timestamp). The steps without
+    wind data have NaN direction and speed and a NO_SOURCE source.
+    """
+    steps = np.arange(start_timestamp, end_timestamp, step_seconds, dtype=np.int64)
+
+    if steps.size == 0:
+        return WindSeries(timestamps=steps,
+                          direction=np.empty(0),
+                          speed=np.empty(0),
+                          source=np.empty(0, dtype=np.int8))
+
+    metar_direction, metar_speed = _metar_wind(airport_icao, steps)
+    taf_direction, taf_speed = _taf_wind(airport_icao, steps)
+
+    from_metar = ~np.isnan(metar_direction) & ~np.isnan(metar_speed)
+    from_taf = ~from_metar & ~np.isnan(taf_direction) & ~np.isnan(taf_speed)
+
+    return WindSeries(
+        timestamps=steps,
+        direction=np.where(from_metar, metar_direction, np.where(from_taf, taf_direction, np.nan)),
+        speed=np.where(from_metar, metar_speed, np.where(from_taf, taf_speed, np.nan)),
+        source=np.select([from_metar, from_taf],
+                         [SOURCE_CODES[WindDataSource.METAR], SOURCE_CODES[WindDataSource.TAF]],
+                         default=NO_SOURCE).astype(np.int8)
+    )
@@ -0,0 +1,72 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import argparse
+import logging
+
+from pymongo import MongoClient
+
+from met_update_db.migrations.engine import migrate, MigrationSettings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrates the documents to the latest schema')
+    parser.add_argument('--db', required=True)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=27017)
+    parser.add_argument('--target-version', type=int)
+    parser.add_argument('--batch-size', type=int, default=MigrationSettings.batch_size)
+    parser.add_argument('--workers', type=int, default=MigrationSettings.workers)
+    parser.add_argument('--duty-cycle', type=float, default=MigrationSettings.duty_cycle)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    # same UUID representation as the one mongoengine uses for the documents' ids
+    client = MongoClient(host=args.host, port=args.port, uuidRepresentation='pythonLegacy')
+
+    migrate(
+        client[args.db],
+        target_version=args.target_version,
+        settings=MigrationSettings(batch_size=args.batch_size,
+                                   workers=args.workers,
+                                   duty_cycle=args.duty_cycle)
+    )
+
+
+if __name__ == '__main__':
+    main()
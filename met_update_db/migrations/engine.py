@@ -0,0 +1,180 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+# Runs the migrations on the raw MongoDB documents.
+#
+# Every document stores the version of the schema it complies with in its `schema_version` field
+# and each migration applies to the documents of a lower version. The documents of each airport
+# are migrated in batches, in parallel across airports, and the progress is checkpointed per
+# (migration, collection, airport) so that an interrupted run resumes where it stopped. Since the
+# ids are not ordered by insertion, the documents written meanwhile by instances still running the
+# previous version may sort before the checkpoint: the documents of an airport are therefore
+# scanned again from the start, on every run, until none of them is pending. After each
+# batch the worker sleeps long enough to keep its share of time spent writing to `duty_cycle`, in
+# order to leave room for the production reads.
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from pymongo import UpdateOne
+from pymongo.database import Database
+
+from met_update_db.migrations import MIGRATIONS
+from met_update_db.migrations.base import Migration
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION_FIELD = 'schema_version'
+CHECKPOINT_COLLECTION = 'migration_checkpoint'
+
+
+@dataclass
+class MigrationSettings:
+    batch_size: int = 500
+    # number of airports migrated in parallel
+    workers: int = 4
+    # share of the time a worker spends migrating, the rest of it is slept
+    duty_cycle: float = 0.5
+
+    def __post_init__(self):
+        if not 0 < self.duty_cycle <= 1:
+            raise ValueError(f"duty_cycle must be within (0, 1]: {self.duty_cycle}")
+
+
+def _checkpoint_id(migration: Migration, collection_name: str, airport_icao: str) -> str:
+    return f"{migration.version}:{collection_name}:{airport_icao}"
+
+
+def _pending_query(migration: Migration, airport_icao: str) -> dict:
+    return {
+        'airport_icao': airport_icao,
+        SCHEMA_VERSION_FIELD: {'$not': {'$gte': migration.version}}
+    }
+
+
+def _migrate_airport(db: Database,
+                     migration: Migration,
+                     collection_name: str,
+                     airport_icao: str,
+                     settings: MigrationSettings) -> int:
+    collection = db[collection_name]
+    checkpoints = db[CHECKPOINT_COLLECTION]
+    checkpoint_id = _checkpoint_id(migration, collection_name, airport_icao)
+
+    checkpoint = checkpoints.find_one({'_id': checkpoint_id}) or {}
+
+    last_id = checkpoint.get('last_id')
+    migrated = 0
+
+    while True:
+        query = _pending_query(migration, airport_icao)
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+
+        start = time.perf_counter()
+
+        batch = list(collection.find(query).sort('_id', 1).limit(settings.batch_size))
+        if not batch:
+            if last_id is None:
+                break
+
+            # a final pass over the pending documents inserted before the checkpoint
+            last_id = None
+            continue
+
+        collection.bulk_write([
+            UpdateOne(
+                {'_id': document['_id'], **_pending_query(migration, airport_icao)},
+                {'$set': {**migration.migrate(document), SCHEMA_VERSION_FIELD: migration.version}}
+            )
+            for document in batch
+        ], ordered=False)
+
+        last_id = batch[-1]['_id']
+        migrated += len(batch)
+        checkpoints.update_one({'_id': checkpoint_id},
+                               {'$set': {'last_id': last_id}, '$inc': {'migrated': len(batch)}},
+                               upsert=True)
+
+        elapsed = time.perf_counter() - start
+        time.sleep(elapsed * (1 - settings.duty_cycle) / settings.duty_cycle)
+
+    checkpoints.update_one({'_id': checkpoint_id}, {'$set': {'done': True}}, upsert=True)
+
+    return migrated
+
+
+def run_migration(db: Database, migration: Migration, settings: MigrationSettings) -> int:
+    migrated = 0
+
+    for collection_name in migration.collections:
+        airports = db[collection_name].distinct('airport_icao')
+
+        with ThreadPoolExecutor(max_workers=settings.workers) as executor:
+            migrated_per_airport = executor.map(
+                lambda icao: _migrate_airport(db, migration, collection_name, icao, settings),
+                airports
+            )
+            migrated += sum(migrated_per_airport)
+
+    logger.info(f"migration {migration.version} ({migration.description}): "
+                f"{migrated} documents migrated")
+
+    return migrated
+
+
+def migrate(db: Database,
+            target_version: int | None = None,
+            settings: MigrationSettings | None = None,
+            migrations: list[Migration] | None = None) -> dict[int, int]:
+    """
+    Applies in order the migrations up to `target_version` (the latest by default) and returns
+    the number of documents migrated by each of them.
+    """
+    settings = settings or MigrationSettings()
+    migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+
+    if target_version is None:
+        target_version = migrations[-1].version
+
+    return {
+        migration.version: run_migration(db, migration, settings)
+        for migration in migrations
+        if migration.version <= target_version
+    }
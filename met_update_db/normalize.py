@@ -0,0 +1,244 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+# Validation and normalization of the TAF / METAR reports before they are stored.
+#
+# The reports are always checked for the keys the backends and the wind lookups read, so that a
+# malformed report is rejected with an `InvalidMETReport` naming the missing key instead of a bare
+# `KeyError`. Once configured, the keys of `NormalizationConfig.strip_keys` (e.g. the `spoken`
+# strings, the `sanitized` duplicates of `raw` and the per-item `repr` fields) are removed wherever
+# they appear in the report before it is stored, whereas the ones of `relocate_keys` are removed
+# as well but are returned separately, by path, for the backends to store them apart from the
+# report:
+#
+#     normalize.configure(NormalizationConfig(strip_keys=DEFAULT_STRIP_KEYS))
+#
+# The size of every normalized report before and after is logged and accumulated in `stats`.
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+import bson
+
+from met_update_db.utils import datetime_from_string, datetime_from_string_with_ms
+from met_update_db.wind import _get_wind_value
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STRIP_KEYS = frozenset({'spoken', 'sanitized', 'repr'})
+
+# the keys read back by the backends and the wind lookups, which can not be stripped
+PROTECTED_KEYS = frozenset({
+    'meta', 'timestamp', 'time', 'start_time', 'end_time', 'dt', 'forecast',
+    'wind_direction', 'wind_speed', 'value',
+})
+
+# the required times of the reports and their parsers
+TAF_REQUIRED_TIMES = (
+    (('meta', 'timestamp'), datetime_from_string_with_ms),
+    (('start_time', 'dt'), datetime_from_string),
+    (('end_time', 'dt'), datetime_from_string),
+)
+TAF_FORECAST_REQUIRED_TIMES = (
+    (('start_time', 'dt'), datetime_from_string),
+    (('end_time', 'dt'), datetime_from_string),
+)
+METAR_REQUIRED_TIMES = (
+    (('meta', 'timestamp'), datetime_from_string_with_ms),
+    (('time', 'dt'), datetime_from_string),
+)
+
+
+class InvalidMETReport(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class NormalizationConfig:
+    # removed wherever they appear in the report
+    strip_keys: frozenset[str] = frozenset()
+    # removed as well, but returned by path in `NormalizedReport.relocated`
+    relocate_keys: frozenset[str] = frozenset()
+
+    def __post_init__(self):
+        protected_keys = (self.strip_keys | self.relocate_keys) & PROTECTED_KEYS
+        if protected_keys:
+            raise ValueError(f"keys needed to read the reports back can not be removed: "
+                             f"{', '.join(sorted(protected_keys))}")
+
+
+@dataclass(frozen=True)
+class NormalizedReport:
+    content: dict
+    # <path of the removed key, e.g. forecast/0/visibility/spoken> -> removed value
+    relocated: dict[str, Any] = field(default_factory=dict)
+    size_before: int | None = None
+    size_after: int | None = None
+
+
+@dataclass
+class NormalizationStats:
+    reports: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def record(self, size_before: int, size_after: int):
+        with self._lock:
+            self.reports += 1
+            self.bytes_before += size_before
+            self.bytes_after += size_after
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    def reset(self):
+        with self._lock:
+            self.reports = self.bytes_before = self.bytes_after = 0
+
+
+stats = NormalizationStats()
+
+_config: NormalizationConfig | None = None
+
+
+def configure(config: NormalizationConfig | None):
+    """
+    Normalizes the reports with `config` from now on, or just validates them if None.
+    """
+    global _config
+    _config = config
+
+
+def _get(report: dict, path: tuple[str, ...], description: str):
+    value = report
+    for key in path:
+        if not isinstance(value, dict) or value.get(key) is None:
+            raise InvalidMETReport(f"{description} is missing '{'.'.join(path)}'")
+        value = value[key]
+
+    return value
+
+
+def _check_times(report: dict, required_times: tuple, description: str):
+    for path, parse in required_times:
+        value = _get(report, path, description)
+
+        try:
+            parse(value)
+        except (TypeError, ValueError):
+            raise InvalidMETReport(f"{description} has an invalid '{'.'.join(path)}': {value!r}")
+
+
+def validate_taf(taf_data: dict, airport_icao: str):
+    description = f"TAF of {airport_icao}"
+
+    if not isinstance(taf_data, dict):
+        raise InvalidMETReport(f"{description} is not a dict")
+
+    _check_times(taf_data, TAF_REQUIRED_TIMES, description)
+
+    forecast = taf_data.get('forecast', [])
+    if not isinstance(forecast, list):
+        raise InvalidMETReport(f"{description} has an invalid 'forecast': not a list")
+
+    for i, item in enumerate(forecast):
+        # the times are only read from the items with wind, see `_get_taf_wind_value`
+        if _get_wind_value(item, 'wind_direction') is not None \
+                or _get_wind_value(item, 'wind_speed') is not None:
+            _check_times(item, TAF_FORECAST_REQUIRED_TIMES, f"{description}, forecast item {i}")
+
+
+def validate_metar(metar_data: dict, airport_icao: str):
+    description = f"METAR of {airport_icao}"
+
+    if not isinstance(metar_data, dict):
+        raise InvalidMETReport(f"{description} is not a dict")
+
+    _check_times(metar_data, METAR_REQUIRED_TIMES, description)
+
+
+def _strip(value, config: NormalizationConfig, path: str, relocated: dict):
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            item_path = f"{path}/{key}" if path else key
+            if key in config.relocate_keys:
+                relocated[item_path] = item
+            elif key not in config.strip_keys:
+                result[key] = _strip(item, config, item_path, relocated)
+        return result
+
+    if isinstance(value, list):
+        return [_strip(item, config, f"{path}/{i}", relocated) for i, item in enumerate(value)]
+
+    return value
+
+
+def _normalize(report: dict, description: str) -> NormalizedReport:
+    config = _config
+    if config is None:
+        return NormalizedReport(content=report)
+
+    relocated = {}
+    content = _strip(report, config, '', relocated)
+
+    size_before, size_after = len(bson.encode(report)), len(bson.encode(content))
+    stats.record(size_before, size_after)
+    logger.debug(f"{description}: {size_before} -> {size_after} bytes")
+
+    return NormalizedReport(content=content,
+                            relocated=relocated,
+                            size_before=size_before,
+                            size_after=size_after)
+
+
+def normalize_taf(taf_data: dict, airport_icao: str) -> NormalizedReport:
+    validate_taf(taf_data, airport_icao)
+
+    return _normalize(taf_data, f"TAF of {airport_icao}")
+
+
+def normalize_metar(metar_data: dict, airport_icao: str) -> NormalizedReport:
+    validate_metar(metar_data, airport_icao)
+
+    return _normalize(metar_data, f"METAR of {airport_icao}")
@@ -36,7 +36,7 @@ Details on EUROCONTROL: http://www.eurocontrol.int
 __author__ = "EUROCONTROL (SWIM)"
 
 from mongoengine import Document, DictField, DateTimeField, StringField, UUIDField, \
-    ComplexDateTimeField
+    ComplexDateTimeField, IntField
 
 
 class Taf(Document):
@@ -46,13 +46,18 @@ class Taf(Document):
     start_time = DateTimeField(required=True)
     end_time = DateTimeField(required=True)
     created_at = ComplexDateTimeField(required=True)
+    # when the report was stored, as opposed to `created_at` which comes with the report
+    ingested_at = DateTimeField()
+    schema_version = IntField()
 
     meta = {
         'indexes': [
             'airport_icao',
             'start_time',
             'end_time',
-            'created_at'
+            'created_at',
+            'ingested_at',
+            ('airport_icao', '-created_at'),
         ],
     }
 
@@ -69,12 +74,17 @@ class Metar(Document):
     content = DictField(required=True)
     time = DateTimeField(required=True)
     created_at = ComplexDateTimeField(required=True)
+    # when the report was stored, as opposed to `created_at` which comes with the report
+    ingested_at = DateTimeField()
+    schema_version = IntField()
 
     meta = {
         'indexes': [
             'airport_icao',
             # 'time',
-            'created_at'
+            'created_at',
+            'ingested_at',
+            ('airport_icao', '-created_at'),
         ],
     }
 
@@ -83,3 +93,24 @@ class Metar(Document):
 
     def __str__(self):
         return self.__repr__()
+
+
+class RelocatedContent(Document):
+    # the id of the report the content was removed from
+    id = UUIDField(required=True, primary_key=True)
+    report_type = StringField(required=True, choices=('METAR', 'TAF'))
+    airport_icao = StringField(required=True)
+    # <path in the report> -> removed value
+    content = DictField(required=True)
+
+    meta = {
+        'indexes': [
+            'airport_icao',
+        ],
+    }
+
+    def __repr__(self):
+        return f"<RelocatedContent: {self.report_type} {self.id}>"
+
+    def __str__(self):
+        return self.__repr__()
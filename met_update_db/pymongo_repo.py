@@ -0,0 +1,293 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+# Implementation of the `repo` API directly on pymongo, without importing mongoengine.
+#
+# It reads and writes the same collections, document layout and indexes as `orm.Taf` and
+# `orm.Metar` (including the string storage of `created_at` and the legacy UUID representation of
+# the ids), so both can be used against the same database. The reports are returned as the
+# lightweight `TafRecord` / `MetarRecord` instead of mongoengine documents.
+
+import datetime
+import uuid
+
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.database import Database
+
+from met_update_db import timeline
+from met_update_db.cache import negative_cache
+from met_update_db.migrations import SCHEMA_VERSION
+from met_update_db.migrations.base import TAF_COLLECTION, METAR_COLLECTION, \
+    RELOCATED_CONTENT_COLLECTION
+from met_update_db.normalize import normalize_taf, normalize_metar, NormalizedReport
+from met_update_db.read_models import TafRecord, MetarRecord, TAF_RECORD_FIELDS, \
+    METAR_RECORD_FIELDS
+from met_update_db.utils import datetime_from_timestamp, datetime_from_string, \
+    datetime_from_string_with_ms, datetime_to_complex_string
+from met_update_db.wind import WindDataSource, WindData, METNotAvailable, _get_wind_value, \
+    _get_taf_wind_value
+
+LATEST_FIRST = [('created_at', DESCENDING)]
+
+_db: Database | None = None
+
+
+def connect(db: str, host: str = 'localhost', port: int = 27017, **kwargs) -> Database:
+    # same UUID representation as the one mongoengine uses for the documents' ids
+    client = MongoClient(host=host, port=port, uuidRepresentation='pythonLegacy', **kwargs)
+
+    use_database(client[db])
+
+    return _db
+
+
+def use_database(db: Database):
+    global _db
+    _db = db
+
+
+def _collection(name: str):
+    if _db is None:
+        raise RuntimeError('no database: call pymongo_repo.connect first')
+
+    return _db[name]
+
+
+def ensure_indexes():
+    for collection_name in (TAF_COLLECTION, METAR_COLLECTION):
+        collection = _collection(collection_name)
+        collection.create_index([('airport_icao', ASCENDING)])
+        collection.create_index([('created_at', ASCENDING)])
+        collection.create_index([('ingested_at', ASCENDING)])
+        collection.create_index([('airport_icao', ASCENDING), ('created_at', DESCENDING)])
+
+    _collection(TAF_COLLECTION).create_index([('start_time', ASCENDING)])
+    _collection(TAF_COLLECTION).create_index([('end_time', ASCENDING)])
+    _collection(RELOCATED_CONTENT_COLLECTION).create_index([('airport_icao', ASCENDING)])
+
+
+def _projection(fields: tuple[str, ...]) -> dict:
+    return {'_id' if field == 'id' else field: True for field in fields}
+
+
+def _insert_relocated_content(report: NormalizedReport, report_id: uuid.UUID, report_type: str,
+                              airport_icao: str):
+    if report.relocated:
+        _collection(RELOCATED_CONTENT_COLLECTION).insert_one({
+            '_id': report_id,
+            'report_type': report_type,
+            'airport_icao': airport_icao,
+            'content': report.relocated,
+        })
+
+
+def add_taf(taf_data: dict, airport_icao: str):
+    report = normalize_taf(taf_data, airport_icao)
+    taf_id = uuid.uuid4()
+
+    _collection(TAF_COLLECTION).insert_one({
+        '_id': taf_id,
+        'airport_icao': airport_icao,
+        'content': report.content,
+        'start_time': datetime_from_string(taf_data['start_time']['dt']),
+        'end_time': datetime_from_string(taf_data['end_time']['dt']),
+        'created_at': datetime_to_complex_string(
+            datetime_from_string_with_ms(taf_data['meta']['timestamp'])
+        ),
+        'ingested_at': datetime.datetime.utcnow(),
+        'schema_version': SCHEMA_VERSION,
+    })
+    _insert_relocated_content(report, taf_id, 'TAF', airport_icao)
+
+    # the state is read after the write, so that `timeline.enable` rebuilds the slots otherwise
+    if timeline.is_enabled(_db):
+        timeline.refresh(_db, airport_icao, timeline.taf_slots(
+            datetime_from_string(taf_data['start_time']['dt']),
+            datetime_from_string(taf_data['end_time']['dt']),
+            datetime_from_string_with_ms(taf_data['meta']['timestamp'])
+        ))
+
+    # only once the new data is readable, see `NegativeCache.generation`
+    negative_cache.invalidate(airport_icao)
+
+
+def add_metar(metar_data: dict, airport_icao: str):
+    report = normalize_metar(metar_data, airport_icao)
+    metar_id = uuid.uuid4()
+
+    _collection(METAR_COLLECTION).insert_one({
+        '_id': metar_id,
+        'airport_icao': airport_icao,
+        'content': report.content,
+        'time': datetime_from_string(metar_data['time']['dt']),
+        'created_at': datetime_to_complex_string(
+            datetime_from_string_with_ms(metar_data['meta']['timestamp'])
+        ),
+        'ingested_at': datetime.datetime.utcnow(),
+        'schema_version': SCHEMA_VERSION,
+    })
+    _insert_relocated_content(report, metar_id, 'METAR', airport_icao)
+
+    # the state is read after the write, so that `timeline.enable` rebuilds the slots otherwise
+    if timeline.is_enabled(_db):
+        timeline.refresh(_db, airport_icao, timeline.metar_slots(
+            datetime_from_string(metar_data['time']['dt']),
+            datetime_from_string_with_ms(metar_data['meta']['timestamp'])
+        ))
+
+    # only once the new data is readable, see `NegativeCache.generation`
+    negative_cache.invalidate(airport_icao)
+
+
+def _taf_filter(airport_icao: str, before_timestamp: int) -> dict:
+    before_datetime = datetime_from_timestamp(before_timestamp)
+
+    return {
+        'airport_icao': airport_icao,
+        'created_at': {'$lte': datetime_to_complex_string(before_datetime)},
+        'start_time': {'$lte': before_datetime},
+        'end_time': {'$gte': before_datetime},
+    }
+
+
+def _metar_filter(airport_icao: str, before_timestamp: int) -> dict:
+    before_datetime = datetime_from_timestamp(before_timestamp)
+
+    return {
+        'airport_icao': airport_icao,
+        'created_at': {'$lte': datetime_to_complex_string(before_datetime)},
+        'time': {
+            '$lte': before_datetime,
+            '$gte': before_datetime - datetime.timedelta(hours=2)
+        },
+    }
+
+
+def get_taf(airport_icao: str,
+            before_timestamp: int,
+            fields: tuple[str, ...] = TAF_RECORD_FIELDS) -> TafRecord | None:
+    doc = _collection(TAF_COLLECTION).find_one(_taf_filter(airport_icao, before_timestamp),
+                                               projection=_projection(fields),
+                                               sort=LATEST_FIRST)
+    if doc is None:
+        return None
+
+    return TafRecord.from_mongo(doc, fields)
+
+
+def get_metar(airport_icao: str,
+              before_timestamp: int,
+              fields: tuple[str, ...] = METAR_RECORD_FIELDS) -> MetarRecord | None:
+    doc = _collection(METAR_COLLECTION).find_one(_metar_filter(airport_icao, before_timestamp),
+                                                 projection=_projection(fields),
+                                                 sort=LATEST_FIRST)
+    if doc is None:
+        return None
+
+    return MetarRecord.from_mongo(doc, fields)
+
+
+def get_metar_wind_data(airport_icao: str, before_timestamp: int) -> WindData | None:
+
+    metar = get_metar(airport_icao, before_timestamp, fields=('content',))
+
+    if not metar:
+        return
+
+    wind_direction = _get_wind_value(content=metar.content, value_key='wind_direction')
+
+    if wind_direction is not None:
+        wind_speed = _get_wind_value(content=metar.content, value_key='wind_speed')
+
+        if wind_speed is not None:
+            return WindData(direction=wind_direction, speed=wind_speed)
+
+
+def get_taf_wind_data(airport_icao: str, before_timestamp: int) -> WindData | None:
+
+    taf = get_taf(airport_icao, before_timestamp, fields=('content',))
+
+    if not taf:
+        return
+
+    wind_direction = _get_taf_wind_value(taf.content, before_timestamp, 'wind_direction')
+
+    if wind_direction is not None:
+        wind_speed = _get_taf_wind_value(taf.content, before_timestamp, 'wind_speed')
+
+        if wind_speed is not None:
+            return WindData(direction=wind_direction, speed=wind_speed)
+
+
+def resolve_wind_data(
+        airport_icao: str,
+        before_timestamp: int
+) -> tuple[WindData, WindDataSource] | None:
+
+    wind_data = get_metar_wind_data(airport_icao, before_timestamp)
+    if wind_data is not None:
+        return wind_data, WindDataSource.METAR
+
+    wind_data = get_taf_wind_data(airport_icao, before_timestamp)
+    if wind_data is not None:
+        return wind_data, WindDataSource.TAF
+
+
+def get_wind_data(airport_icao: str, before_timestamp: int) -> tuple[WindData, WindDataSource]:
+
+    if negative_cache.contains(airport_icao, before_timestamp):
+        raise METNotAvailable()
+
+    generation = negative_cache.generation(airport_icao)
+
+    result = resolve_wind_data(airport_icao, before_timestamp)
+    if result is None:
+        negative_cache.add(airport_icao, before_timestamp, generation)
+        raise METNotAvailable()
+
+    return result
+
+
+def get_last_taf_end_time(airport_icao: str) -> datetime.datetime | None:
+    taf = _collection(TAF_COLLECTION).find_one({'airport_icao': airport_icao},
+                                               projection={'end_time': True},
+                                               sort=LATEST_FIRST)
+
+    if taf is None:
+        raise METNotAvailable()
+
+    return taf['end_time']
@@ -0,0 +1,87 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import datetime
+import uuid
+from dataclasses import dataclass, fields
+
+from met_update_db.utils import datetime_from_complex_string
+
+
+def _from_mongo_value(field_name: str, value):
+    # `created_at` is a `ComplexDateTimeField` which is stored as a string
+    if field_name == 'created_at' and isinstance(value, str):
+        return datetime_from_complex_string(value)
+
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class TafRecord:
+    id: uuid.UUID | None = None
+    airport_icao: str | None = None
+    content: dict | None = None
+    start_time: datetime.datetime | None = None
+    end_time: datetime.datetime | None = None
+    created_at: datetime.datetime | None = None
+
+    @classmethod
+    def from_mongo(cls, doc: dict, field_names: tuple[str, ...]) -> "TafRecord":
+        return cls(**{
+            name: _from_mongo_value(name, doc.get('_id' if name == 'id' else name))
+            for name in field_names
+        })
+
+
+@dataclass(frozen=True, slots=True)
+class MetarRecord:
+    id: uuid.UUID | None = None
+    airport_icao: str | None = None
+    content: dict | None = None
+    time: datetime.datetime | None = None
+    created_at: datetime.datetime | None = None
+
+    @classmethod
+    def from_mongo(cls, doc: dict, field_names: tuple[str, ...]) -> "MetarRecord":
+        return cls(**{
+            name: _from_mongo_value(name, doc.get('_id' if name == 'id' else name))
+            for name in field_names
+        })
+
+
+TAF_RECORD_FIELDS = tuple(field.name for field in fields(TafRecord))
+METAR_RECORD_FIELDS = tuple(field.name for field in fields(MetarRecord))
@@ -37,94 +37,155 @@ __author__ = "EUROCONTROL (SWIM)"
 
 import datetime
 import uuid
-from dataclasses import dataclass
-from enum import Enum
-
-from mongoengine import Q
-
-from met_update_db.orm import Taf, Metar
+from typing import Iterator
+
+from mongoengine import Q, Document, QuerySet
+from mongoengine.connection import get_db
+
+from met_update_db import timeline, wind_table
+from met_update_db.cache import negative_cache
+from met_update_db.diagnostics import track_query
+from met_update_db.migrations import SCHEMA_VERSION
+from met_update_db.normalize import normalize_taf, normalize_metar, NormalizedReport
+from met_update_db.orm import Taf, Metar, RelocatedContent
+from met_update_db.read_models import TafRecord, MetarRecord, TAF_RECORD_FIELDS, \
+    METAR_RECORD_FIELDS
 from met_update_db.utils import datetime_from_timestamp, datetime_from_string, \
     datetime_from_string_with_ms
+from met_update_db.wind import WindDataSource, WindData, METNotAvailable, _get_wind_value, \
+    _get_taf_wind_value
 
 
-class WindDataSource(Enum):
-    METAR = 'METAR'
-    TAF = 'TAF'
-
-
-@dataclass
-class WindData:
-    direction: float
-    speed: float
-
-
-class METNotAvailable(Exception):
-    ...
+def _save_relocated_content(report: NormalizedReport, report_id, report_type: str,
+                            airport_icao: str):
+    if report.relocated:
+        RelocatedContent(id=report_id,
+                         report_type=report_type,
+                         airport_icao=airport_icao,
+                         content=report.relocated).save()
 
 
 def add_taf(taf_data: dict, airport_icao: str):
+    report = normalize_taf(taf_data, airport_icao)
+
     taf = Taf(
         id=uuid.uuid4().hex,
         airport_icao=airport_icao,
-        content=taf_data,
+        content=report.content,
         start_time=datetime_from_string(taf_data['start_time']['dt']),
         end_time=datetime_from_string(taf_data['end_time']['dt']),
-        created_at=datetime_from_string_with_ms(taf_data['meta']['timestamp'])
+        created_at=datetime_from_string_with_ms(taf_data['meta']['timestamp']),
+        ingested_at=datetime.datetime.utcnow(),
+        schema_version=SCHEMA_VERSION
     )
     taf.save()
+    _save_relocated_content(report, taf.id, 'TAF', airport_icao)
+
+    # the state is read after the write, so that `timeline.enable` rebuilds the slots otherwise
+    if timeline.is_enabled(get_db()):
+        timeline.refresh(get_db(), airport_icao,
+                         timeline.taf_slots(taf.start_time, taf.end_time, taf.created_at))
+
+    # only once the new data is readable, see `NegativeCache.generation`
+    negative_cache.invalidate(airport_icao)
 
 
 def add_metar(metar_data: dict, airport_icao: str):
+    report = normalize_metar(metar_data, airport_icao)
+
     metar = Metar(
         id=uuid.uuid4().hex,
         airport_icao=airport_icao,
-        content=metar_data,
+        content=report.content,
         time=datetime_from_string(metar_data['time']['dt']),
-        created_at=datetime_from_string_with_ms(metar_data['meta']['timestamp'])
+        created_at=datetime_from_string_with_ms(metar_data['meta']['timestamp']),
+        ingested_at=datetime.datetime.utcnow(),
+        schema_version=SCHEMA_VERSION
     )
     metar.save()
+    _save_relocated_content(report, metar.id, 'METAR', airport_icao)
 
+    # the state is read after the write, so that `timeline.enable` rebuilds the slots otherwise
+    if timeline.is_enabled(get_db()):
+        timeline.refresh(get_db(), airport_icao, timeline.metar_slots(metar.time, metar.created_at))
 
-def get_taf(airport_icao: str, before_timestamp: int) -> Taf | None:
+    # only once the new data is readable, see `NegativeCache.generation`
+    negative_cache.invalidate(airport_icao)
+
+
+def _taf_query(airport_icao: str, before_timestamp: int) -> Q:
     before_datetime = datetime_from_timestamp(before_timestamp)
 
-    result = Taf.objects(
+    return (
         Q(airport_icao=airport_icao)
         & Q(created_at__lte=before_datetime)
         & Q(start_time__lte=before_datetime)
         & Q(end_time__gte=before_datetime)
-    ).order_by('-created_at')
-
-    if result.count() == 0:
-        return None
-
-    return result[0]
+    )
 
 
-def get_metar(airport_icao: str, before_timestamp: int) -> Metar | None:
+def _metar_query(airport_icao: str, before_timestamp: int) -> Q:
     before_datetime = datetime_from_timestamp(before_timestamp)
     before_datetime_two_hours_ago = (before_datetime - datetime.timedelta(hours=2))
 
-    result = Metar.objects(
+    return (
         Q(airport_icao=airport_icao)
         & Q(created_at__lte=before_datetime)
         & Q(time__lte=before_datetime)
         & Q(time__gte=before_datetime_two_hours_ago)
-    ).order_by('-created_at')
+    )
+
+
+def get_taf(airport_icao: str, before_timestamp: int) -> Taf | None:
+    result = Taf.objects(_taf_query(airport_icao, before_timestamp)).order_by('-created_at')
+
+    with track_query('get_taf', result, limit=1):
+        return result.first()
+
 
-    if result.count() == 0:
+def get_metar(airport_icao: str, before_timestamp: int) -> Metar | None:
+    result = Metar.objects(_metar_query(airport_icao, before_timestamp)).order_by('-created_at')
+
+    with track_query('get_metar', result, limit=1):
+        return result.first()
+
+
+def get_taf_record(
+        airport_icao: str,
+        before_timestamp: int,
+        fields: tuple[str, ...] = TAF_RECORD_FIELDS
+) -> TafRecord | None:
+    result = Taf.objects(_taf_query(airport_icao, before_timestamp)) \
+        .order_by('-created_at') \
+        .only(*fields) \
+        .as_pymongo()
+
+    with track_query('get_taf_record', result, limit=1):
+        doc = result.first()
+
+    if doc is None:
         return None
 
-    return result[0]
+    return TafRecord.from_mongo(doc, fields)
 
 
-def _get_wind_value(content: dict, value_key: str) -> float | None:
-    try:
-        result = float(content[value_key]['value'])
-    except (IndexError, KeyError, TypeError, ValueError):
-        result = None
+def get_metar_record(
+        airport_icao: str,
+        before_timestamp: int,
+        fields: tuple[str, ...] = METAR_RECORD_FIELDS
+) -> MetarRecord | None:
+    result = Metar.objects(_metar_query(airport_icao, before_timestamp)) \
+        .order_by('-created_at') \
+        .only(*fields) \
+        .as_pymongo()
+
+    with track_query('get_metar_record', result, limit=1):
+        doc = result.first()
 
-    return result
+    if doc is None:
+        return None
+
+    return MetarRecord.from_mongo(doc, fields)
 
 
 def get_metar_wind_data(airport_icao: str, before_timestamp: int) -> WindData | None:
@@ -143,26 +204,6 @@ def get_metar_wind_data(airport_icao: str, before_timestamp: int) -> WindData |
             return WindData(direction=wind_direction, speed=wind_speed)
 
 
-def _get_taf_wind_value(taf_content: dict, before_timestamp: int, value_key: str) -> float | None:
-
-    backup = None
-    for forecast_item in taf_content['forecast']:
-        wind_value = _get_wind_value(content=forecast_item, value_key=value_key)
-
-        if wind_value is None:
-            continue
-
-        start_time_timestamp = datetime_from_string(forecast_item['start_time']['dt']).timestamp()
-        end_time_timestamp = datetime_from_string(forecast_item['end_time']['dt']).timestamp()
-
-        if start_time_timestamp <= before_timestamp <= end_time_timestamp:
-            return wind_value
-
-        backup = wind_value
-
-    return backup
-
-
 def _get_taf_wind_direction(taf: Taf, before_timestamp: int) -> float | None:
     return _get_taf_wind_value(taf.content, before_timestamp, value_key='wind_direction')
 
@@ -187,7 +228,10 @@ def get_taf_wind_data(airport_icao: str, before_timestamp: int) -> WindData | No
             return WindData(direction=wind_direction, speed=wind_speed)
 
 
-def get_wind_data(airport_icao: str, before_timestamp: int) -> tuple[WindData, WindDataSource]:
+def resolve_wind_data(
+        airport_icao: str,
+        before_timestamp: int
+) -> tuple[WindData, WindDataSource] | None:
 
     wind_data = get_metar_wind_data(airport_icao, before_timestamp)
     if wind_data is not None:
@@ -197,13 +241,110 @@ def get_wind_data(airport_icao: str, before_timestamp: int) -> tuple[WindData, W
     if wind_data is not None:
         return wind_data, WindDataSource.TAF
 
-    raise METNotAvailable()
+
+def get_wind_data(airport_icao: str, before_timestamp: int) -> tuple[WindData, WindDataSource]:
+
+    if negative_cache.contains(airport_icao, before_timestamp):
+        raise METNotAvailable()
+
+    generation = negative_cache.generation(airport_icao)
+
+    try:
+        result = wind_table.lookup(airport_icao, before_timestamp)
+        if result is not None:
+            return result
+
+        if timeline.is_enabled(get_db(), max_age_seconds=timeline.READ_STATE_MAX_AGE_SECONDS):
+            result = timeline.get_wind_data(get_db(), airport_icao, before_timestamp)
+            if result is not None:
+                return result
+
+        result = resolve_wind_data(airport_icao, before_timestamp)
+        if result is None:
+            raise METNotAvailable()
+
+        return result
+    except METNotAvailable:
+        negative_cache.add(airport_icao, before_timestamp, generation)
+        raise
 
 
 def get_last_taf_end_time(airport_icao: str) -> datetime.datetime | None:
-    taf = Taf.objects(airport_icao=airport_icao).order_by('-created_at').all()
+    result = Taf.objects(airport_icao=airport_icao).order_by('-created_at').only('end_time')
 
-    if not taf:
+    with track_query('get_last_taf_end_time', result, limit=1):
+        taf = result.first()
+
+    if taf is None:
         raise METNotAvailable()
 
-    return taf[0].end_time
+    return taf.end_time
+
+
+def _iter_documents(
+        queryset: QuerySet,
+        fields: tuple[str, ...] | None,
+        batch_size: int,
+        chunk_size: int | None
+) -> Iterator[Document] | Iterator[list[Document]]:
+    queryset = queryset.no_cache().batch_size(batch_size)
+
+    if fields is not None:
+        queryset = queryset.only(*fields)
+
+    if chunk_size is None:
+        yield from queryset
+        return
+
+    chunk = []
+    for document in queryset:
+        chunk.append(document)
+
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def iter_metars(
+        airport_icao: str,
+        start_timestamp: int,
+        end_timestamp: int,
+        fields: tuple[str, ...] | None = None,
+        batch_size: int = 1000,
+        chunk_size: int | None = None
+) -> Iterator[Metar] | Iterator[list[Metar]]:
+    """
+    Streams the METARs observed within [start_timestamp, end_timestamp) in chronological order,
+    one by one or in lists of `chunk_size`, without caching them in the queryset.
+    """
+    metars = Metar.objects(
+        Q(airport_icao=airport_icao)
+        & Q(time__gte=datetime_from_timestamp(start_timestamp))
+        & Q(time__lt=datetime_from_timestamp(end_timestamp))
+    ).order_by('time')
+
+    return _iter_documents(metars, fields, batch_size, chunk_size)
+
+
+def iter_tafs(
+        airport_icao: str,
+        start_timestamp: int,
+        end_timestamp: int,
+        fields: tuple[str, ...] | None = None,
+        batch_size: int = 1000,
+        chunk_size: int | None = None
+) -> Iterator[Taf] | Iterator[list[Taf]]:
+    """
+    Streams the TAFs whose validity overlaps [start_timestamp, end_timestamp) in order of
+    creation, one by one or in lists of `chunk_size`, without caching them in the queryset.
+    """
+    tafs = Taf.objects(
+        Q(airport_icao=airport_icao)
+        & Q(start_time__lt=datetime_from_timestamp(end_timestamp))
+        & Q(end_time__gte=datetime_from_timestamp(start_timestamp))
+    ).order_by('created_at')
+
+    return _iter_documents(tafs, fields, batch_size, chunk_size)
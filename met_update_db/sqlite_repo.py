@@ -0,0 +1,329 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+# Implementation of the `repo` API on an embedded SQLite database, for deployments without a
+# MongoDB server.
+#
+# The times and the METAR wind are stored in their own columns, indexed for the predicates of
+# `get_taf` / `get_metar`, next to the JSON content of the reports. The times are stored as ISO
+# strings of the same naive datetimes the MongoDB backends store, so that they compare the same
+# way. The database runs in WAL mode, so readers are not blocked by the writer, and every thread
+# uses its own connection.
+
+import datetime
+import json
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+
+from met_update_db.cache import negative_cache
+from met_update_db.migrations import SCHEMA_VERSION
+from met_update_db.normalize import normalize_taf, normalize_metar, NormalizedReport
+from met_update_db.read_models import TafRecord, MetarRecord, TAF_RECORD_FIELDS, \
+    METAR_RECORD_FIELDS
+from met_update_db.utils import datetime_from_timestamp, datetime_from_string, \
+    datetime_from_string_with_ms
+from met_update_db.wind import WindDataSource, WindData, METNotAvailable, _get_wind_value, \
+    _get_taf_wind_value
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS taf (
+    id TEXT PRIMARY KEY,
+    airport_icao TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    schema_version INTEGER,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS taf_airport_icao_created_at ON taf (airport_icao, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS metar (
+    id TEXT PRIMARY KEY,
+    airport_icao TEXT NOT NULL,
+    time TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    wind_direction REAL,
+    wind_speed REAL,
+    schema_version INTEGER,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS metar_airport_icao_time ON metar (airport_icao, time, created_at);
+
+CREATE TABLE IF NOT EXISTS relocated_content (
+    id TEXT PRIMARY KEY,
+    report_type TEXT NOT NULL,
+    airport_icao TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+"""
+
+METAR_COLUMNS = METAR_RECORD_FIELDS + ('wind_direction', 'wind_speed')
+
+_path: str | Path | None = None
+_local = threading.local()
+
+
+def _to_text(value: datetime.datetime) -> str:
+    return value.isoformat(sep=' ', timespec='microseconds')
+
+
+def _from_text(value: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value)
+
+
+def connect(path: str | Path):
+    global _path
+    _path = path
+
+    connection = _connection()
+    connection.executescript(SCHEMA)
+
+
+def _connection() -> sqlite3.Connection:
+    if _path is None:
+        raise RuntimeError('no database: call sqlite_repo.connect first')
+
+    connection = getattr(_local, 'connection', None)
+
+    if connection is None or _local.path != _path:
+        connection = sqlite3.connect(_path, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        _local.connection, _local.path = connection, _path
+
+    return connection
+
+
+def close():
+    connection = getattr(_local, 'connection', None)
+
+    if connection is not None:
+        connection.close()
+        _local.connection = None
+
+
+def _insert_relocated_content(report: NormalizedReport, report_id: str, report_type: str,
+                              airport_icao: str):
+    if report.relocated:
+        _connection().execute(
+            'INSERT INTO relocated_content (id, report_type, airport_icao, content) '
+            'VALUES (?, ?, ?, ?)',
+            (report_id, report_type, airport_icao, json.dumps(report.relocated))
+        )
+
+
+def add_taf(taf_data: dict, airport_icao: str):
+    report = normalize_taf(taf_data, airport_icao)
+    taf_id = uuid.uuid4().hex
+
+    _connection().execute(
+        'INSERT INTO taf (id, airport_icao, start_time, end_time, created_at, schema_version, '
+        'content) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        (
+            taf_id,
+            airport_icao,
+            _to_text(datetime_from_string(taf_data['start_time']['dt'])),
+            _to_text(datetime_from_string(taf_data['end_time']['dt'])),
+            _to_text(datetime_from_string_with_ms(taf_data['meta']['timestamp'])),
+            SCHEMA_VERSION,
+            json.dumps(report.content),
+        )
+    )
+    _insert_relocated_content(report, taf_id, 'TAF', airport_icao)
+    negative_cache.invalidate(airport_icao)
+
+
+def add_metar(metar_data: dict, airport_icao: str):
+    report = normalize_metar(metar_data, airport_icao)
+    metar_id = uuid.uuid4().hex
+
+    _connection().execute(
+        'INSERT INTO metar (id, airport_icao, time, created_at, wind_direction, wind_speed, '
+        'schema_version, content) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        (
+            metar_id,
+            airport_icao,
+            _to_text(datetime_from_string(metar_data['time']['dt'])),
+            _to_text(datetime_from_string_with_ms(metar_data['meta']['timestamp'])),
+            _get_wind_value(metar_data, 'wind_direction'),
+            _get_wind_value(metar_data, 'wind_speed'),
+            SCHEMA_VERSION,
+            json.dumps(report.content),
+        )
+    )
+    _insert_relocated_content(report, metar_id, 'METAR', airport_icao)
+    negative_cache.invalidate(airport_icao)
+
+
+def _columns(fields: tuple[str, ...], allowed_fields: tuple[str, ...]) -> str:
+    unknown_fields = set(fields) - set(allowed_fields)
+    if unknown_fields:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown_fields))}")
+
+    return ', '.join(fields)
+
+
+def _record_value(field: str, value):
+    if value is None:
+        return None
+
+    if field == 'id':
+        return uuid.UUID(value)
+
+    if field == 'content':
+        return json.loads(value)
+
+    if field in ('start_time', 'end_time', 'time', 'created_at'):
+        return _from_text(value)
+
+    return value
+
+
+def get_taf(airport_icao: str,
+            before_timestamp: int,
+            fields: tuple[str, ...] = TAF_RECORD_FIELDS) -> TafRecord | None:
+    before_datetime = _to_text(datetime_from_timestamp(before_timestamp))
+
+    row = _connection().execute(
+        f"SELECT {_columns(fields, TAF_RECORD_FIELDS)} FROM taf "
+        f"WHERE airport_icao = ? AND created_at <= ? AND start_time <= ? AND end_time >= ? "
+        f"ORDER BY created_at DESC LIMIT 1",
+        (airport_icao, before_datetime, before_datetime, before_datetime)
+    ).fetchone()
+
+    if row is None:
+        return None
+
+    return TafRecord(**{field: _record_value(field, value) for field, value in zip(fields, row)})
+
+
+def _metar_row(airport_icao: str, before_timestamp: int, columns: tuple[str, ...]) -> tuple | None:
+    before_datetime = datetime_from_timestamp(before_timestamp)
+
+    return _connection().execute(
+        f"SELECT {_columns(columns, METAR_COLUMNS)} FROM metar "
+        f"WHERE airport_icao = ? AND created_at <= ? AND time <= ? AND time >= ? "
+        f"ORDER BY created_at DESC LIMIT 1",
+        (
+            airport_icao,
+            _to_text(before_datetime),
+            _to_text(before_datetime),
+            _to_text(before_datetime - datetime.timedelta(hours=2))
+        )
+    ).fetchone()
+
+
+def get_metar(airport_icao: str,
+              before_timestamp: int,
+              fields: tuple[str, ...] = METAR_RECORD_FIELDS) -> MetarRecord | None:
+    row = _metar_row(airport_icao, before_timestamp, fields)
+
+    if row is None:
+        return None
+
+    return MetarRecord(**{field: _record_value(field, value) for field, value in zip(fields, row)})
+
+
+def get_metar_wind_data(airport_icao: str, before_timestamp: int) -> WindData | None:
+    row = _metar_row(airport_icao, before_timestamp, ('wind_direction', 'wind_speed'))
+
+    if row is None:
+        return
+
+    wind_direction, wind_speed = row
+
+    if wind_direction is not None and wind_speed is not None:
+        return WindData(direction=wind_direction, speed=wind_speed)
+
+
+def get_taf_wind_data(airport_icao: str, before_timestamp: int) -> WindData | None:
+
+    taf = get_taf(airport_icao, before_timestamp, fields=('content',))
+
+    if not taf:
+        return
+
+    wind_direction = _get_taf_wind_value(taf.content, before_timestamp, 'wind_direction')
+
+    if wind_direction is not None:
+        wind_speed = _get_taf_wind_value(taf.content, before_timestamp, 'wind_speed')
+
+        if wind_speed is not None:
+            return WindData(direction=wind_direction, speed=wind_speed)
+
+
+def resolve_wind_data(
+        airport_icao: str,
+        before_timestamp: int
+) -> tuple[WindData, WindDataSource] | None:
+
+    wind_data = get_metar_wind_data(airport_icao, before_timestamp)
+    if wind_data is not None:
+        return wind_data, WindDataSource.METAR
+
+    wind_data = get_taf_wind_data(airport_icao, before_timestamp)
+    if wind_data is not None:
+        return wind_data, WindDataSource.TAF
+
+
+def get_wind_data(airport_icao: str, before_timestamp: int) -> tuple[WindData, WindDataSource]:
+
+    if negative_cache.contains(airport_icao, before_timestamp):
+        raise METNotAvailable()
+
+    generation = negative_cache.generation(airport_icao)
+
+    result = resolve_wind_data(airport_icao, before_timestamp)
+    if result is None:
+        negative_cache.add(airport_icao, before_timestamp, generation)
+        raise METNotAvailable()
+
+    return result
+
+
+def get_last_taf_end_time(airport_icao: str) -> datetime.datetime | None:
+    row = _connection().execute(
+        'SELECT end_time FROM taf WHERE airport_icao = ? ORDER BY created_at DESC LIMIT 1',
+        (airport_icao,)
+    ).fetchone()
+
+    if row is None:
+        raise METNotAvailable()
+
+    return _from_text(row[0])
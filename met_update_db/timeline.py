@@ -0,0 +1,415 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import argparse
+import datetime
+import time
+from collections import defaultdict
+from typing import Iterable
+
+from pymongo import ReplaceOne, MongoClient, ReturnDocument
+from pymongo.database import Database
+from pymongo.errors import BulkWriteError
+
+from met_update_db.migrations.base import TAF_COLLECTION, METAR_COLLECTION
+from met_update_db.utils import datetime_from_timestamp, datetime_from_complex_string
+from met_update_db.wind import WindData, WindDataSource, METNotAvailable, _get_wind_value, \
+    _get_taf_wind_value
+
+DESCRIPTION = """
+Materialized per airport wind timeline.
+
+Every `SLOT_SECONDS` slot of an airport is stored under the `<airport_icao>:<slot_timestamp>` key
+with the wind of the METARs and TAFs which are eligible at any time within it, so that lookups
+become a single fetch by id followed by the resolution of `repo.resolve_wind_data` at the exact
+timestamp among the reports of the slot.
+
+Whether the timeline is enabled is stored in the database, since all the processes writing
+reports have to maintain it: while enabled, the slots affected by a new METAR or TAF are rebuilt
+by `add_metar` / `add_taf` of `repo` and `pymongo_repo`. Enabling it also rebuilds the whole
+timeline from the stored reports, whereas disabling it drops it:
+
+    python -m met_update_db.timeline --db met-update {enable,disable,rebuild} [--airport EHAM]
+
+This trades write volume for reads: every slot a report is eligible in is rewritten whole with all
+the reports of the slot, i.e. about 13 slot documents per METAR and 180 per TAF of 30 hours.
+
+Concurrent writers may refresh the same slots from different reads of the reports. Each refresh
+takes a per airport sequence number before reading them and a slot is only replaced by a refresh
+with a higher number, so that the last read, which includes the reports of all the writers having
+taken a lower number, wins regardless of the order in which the writes land.
+"""
+
+TIMELINE_COLLECTION = 'wind_timeline_slot'
+STATE_COLLECTION = 'wind_timeline_state'
+STATE_ID = 'timeline'
+SEQUENCE_COLLECTION = 'wind_timeline_sequence'
+
+DUPLICATE_KEY_ERROR = 11000
+
+SLOT_SECONDS = 10 * 60
+
+METAR_VALIDITY_SECONDS = 2 * 60 * 60
+
+# the number of slots rebuilt at once by `rebuild`
+REBUILD_CHUNK_SLOTS = 24 * 60 * 60 // SLOT_SECONDS
+
+# how long readers may use a cached enabled state: a stale one is harmless to them, since the
+# slots are dropped on disable and missing slots fall back to the reports
+READ_STATE_MAX_AGE_SECONDS = 5.
+
+# (database name, enabled, monotonic expiry)
+_read_state: tuple[str, bool, float] | None = None
+
+
+def enable(db: Database):
+    global _read_state
+    _read_state = None
+
+    db[STATE_COLLECTION].update_one({'_id': STATE_ID}, {'$set': {'enabled': True}}, upsert=True)
+
+    # covers the reports written before, and while the writers were learning about the state
+    rebuild(db)
+
+
+def disable(db: Database):
+    global _read_state
+    _read_state = None
+
+    db[STATE_COLLECTION].update_one({'_id': STATE_ID}, {'$set': {'enabled': False}}, upsert=True)
+
+    db[TIMELINE_COLLECTION].delete_many({})
+
+
+def is_enabled(db: Database, max_age_seconds: float = 0.) -> bool:
+    """
+    Writers must read the current state (the default), whereas readers may pass
+    `READ_STATE_MAX_AGE_SECONDS`.
+    """
+    global _read_state
+
+    if max_age_seconds and _read_state is not None:
+        db_name, enabled, expiry = _read_state
+        if db_name == db.name and time.monotonic() < expiry:
+            return enabled
+
+    state = db[STATE_COLLECTION].find_one({'_id': STATE_ID}) or {}
+    enabled = state.get('enabled', False)
+
+    _read_state = db.name, enabled, time.monotonic() + READ_STATE_MAX_AGE_SECONDS
+
+    return enabled
+
+
+def slot_timestamp(timestamp: float) -> int:
+    timestamp = int(timestamp)
+
+    return timestamp - timestamp % SLOT_SECONDS
+
+
+def _slot_id(airport_icao: str, slot: int) -> str:
+    return f"{airport_icao}:{slot}"
+
+
+def _slots(start_timestamp: float, end_timestamp: float) -> range:
+    # the slots overlapping with [start_timestamp, end_timestamp]
+    return range(slot_timestamp(start_timestamp), slot_timestamp(end_timestamp) + 1, SLOT_SECONDS)
+
+
+def _metar_eligibility(time_: datetime.datetime,
+                       created_at: datetime.datetime) -> tuple[float, float]:
+    # a METAR is eligible from its creation and for two hours after its observation time
+    return (
+        max(time_.timestamp(), created_at.timestamp()),
+        time_.timestamp() + METAR_VALIDITY_SECONDS
+    )
+
+
+def _taf_eligibility(start_time: datetime.datetime,
+                     end_time: datetime.datetime,
+                     created_at: datetime.datetime) -> tuple[float, float]:
+    return (
+        max(start_time.timestamp(), created_at.timestamp()),
+        end_time.timestamp()
+    )
+
+
+def metar_slots(time_: datetime.datetime, created_at: datetime.datetime) -> range:
+    return _slots(*_metar_eligibility(time_, created_at))
+
+
+def taf_slots(start_time: datetime.datetime,
+              end_time: datetime.datetime,
+              created_at: datetime.datetime) -> range:
+    return _slots(*_taf_eligibility(start_time, end_time, created_at))
+
+
+def _created_at(document: dict) -> datetime.datetime:
+    # `created_at` is stored as the string of a `ComplexDateTimeField`
+    return datetime_from_complex_string(document['created_at'])
+
+
+def _metar_candidate(metar: dict) -> dict:
+    created_at = _created_at(metar)
+    eligible_from, eligible_to = _metar_eligibility(metar['time'], created_at)
+
+    return {
+        'eligible_from': eligible_from,
+        'eligible_to': eligible_to,
+        'created_at': created_at.timestamp(),
+        'direction': _get_wind_value(metar['content'], 'wind_direction'),
+        'speed': _get_wind_value(metar['content'], 'wind_speed'),
+    }
+
+
+def _taf_candidate(taf: dict) -> dict:
+    created_at = _created_at(taf)
+    eligible_from, eligible_to = _taf_eligibility(taf['start_time'], taf['end_time'], created_at)
+
+    # only what `_get_taf_wind_value` reads from the forecast items with wind
+    forecast = []
+    for item in taf['content'].get('forecast', []):
+        direction = _get_wind_value(item, 'wind_direction')
+        speed = _get_wind_value(item, 'wind_speed')
+
+        if direction is not None or speed is not None:
+            forecast.append({
+                'start_time': {'dt': item['start_time']['dt']},
+                'end_time': {'dt': item['end_time']['dt']},
+                'wind_direction': {'value': direction},
+                'wind_speed': {'value': speed},
+            })
+
+    return {
+        'eligible_from': eligible_from,
+        'eligible_to': eligible_to,
+        'created_at': created_at.timestamp(),
+        'forecast': forecast,
+    }
+
+
+def _overlapping_reports(db: Database,
+                         airport_icao: str,
+                         start_timestamp: int,
+                         end_timestamp: int) -> tuple[list[dict], list[dict]]:
+    # the reports which may be eligible at some time within [start_timestamp, end_timestamp)
+    start_datetime = datetime_from_timestamp(start_timestamp)
+    end_datetime = datetime_from_timestamp(end_timestamp)
+
+    metars = db[METAR_COLLECTION].find(
+        {
+            'airport_icao': airport_icao,
+            'time': {
+                '$lt': end_datetime,
+                '$gte': datetime_from_timestamp(start_timestamp - METAR_VALIDITY_SECONDS),
+            },
+        },
+        projection={'time': True, 'created_at': True, 'content': True}
+    )
+
+    tafs = db[TAF_COLLECTION].find(
+        {
+            'airport_icao': airport_icao,
+            'start_time': {'$lt': end_datetime},
+            'end_time': {'$gte': start_datetime},
+        },
+        projection={'start_time': True, 'end_time': True, 'created_at': True, 'content': True}
+    )
+
+    return list(metars), list(tafs)
+
+
+def _add_to_slots(slots: dict[int, list], candidate: dict):
+    for slot in _slots(candidate['eligible_from'], candidate['eligible_to']):
+        if slot in slots:
+            slots[slot].append(candidate)
+
+
+def _next_sequence(db: Database, airport_icao: str) -> int:
+    sequence = db[SEQUENCE_COLLECTION].find_one_and_update(
+        {'_id': airport_icao},
+        {'$inc': {'sequence': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+    return sequence['sequence']
+
+
+def refresh(db: Database, airport_icao: str, slots: Iterable[int]):
+    """
+    Rebuilds `slots` from the reports stored for the airport, which are fetched at once.
+    """
+    slots = sorted(slots)
+    if not slots:
+        return
+
+    # before reading the reports, see `DESCRIPTION`
+    sequence = _next_sequence(db, airport_icao)
+
+    metars, tafs = _overlapping_reports(db, airport_icao, slots[0], slots[-1] + SLOT_SECONDS)
+
+    metars_per_slot = {slot: [] for slot in slots}
+    for metar in metars:
+        _add_to_slots(metars_per_slot, _metar_candidate(metar))
+
+    tafs_per_slot = {slot: [] for slot in slots}
+    for taf in tafs:
+        _add_to_slots(tafs_per_slot, _taf_candidate(taf))
+
+    operations = []
+    for slot in slots:
+        slot_id = _slot_id(airport_icao, slot)
+
+        # empty slots are kept, as they carry the sequence number
+        timeline_slot = {
+            '_id': slot_id,
+            'airport_icao': airport_icao,
+            'slot_timestamp': slot,
+            'sequence': sequence,
+            'metars': metars_per_slot[slot],
+            'tafs': tafs_per_slot[slot],
+        }
+        operations.append(
+            ReplaceOne({'_id': slot_id, 'sequence': {'$lt': sequence}}, timeline_slot, upsert=True)
+        )
+
+    try:
+        db[TIMELINE_COLLECTION].bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        # a slot refreshed by a later read fails the filter, and the upsert then the insert
+        if any(error['code'] != DUPLICATE_KEY_ERROR for error in e.details['writeErrors']):
+            raise
+
+
+def _latest_eligible(candidates: list[dict], timestamp: int) -> dict | None:
+    eligible = [
+        candidate for candidate in candidates
+        if candidate['eligible_from'] <= timestamp <= candidate['eligible_to']
+    ]
+
+    return max(eligible, key=lambda candidate: candidate['created_at'], default=None)
+
+
+def _resolve(timeline_slot: dict, before_timestamp: int) -> tuple[WindData, WindDataSource] | None:
+    # same rules as `repo.resolve_wind_data`, among the reports of the slot
+    metar = _latest_eligible(timeline_slot.get('metars', []), before_timestamp)
+    if metar is not None and metar['direction'] is not None and metar['speed'] is not None:
+        return WindData(direction=metar['direction'], speed=metar['speed']), WindDataSource.METAR
+
+    taf = _latest_eligible(timeline_slot.get('tafs', []), before_timestamp)
+    if taf is not None:
+        direction = _get_taf_wind_value(taf, before_timestamp, value_key='wind_direction')
+
+        if direction is not None:
+            speed = _get_taf_wind_value(taf, before_timestamp, value_key='wind_speed')
+
+            if speed is not None:
+                return WindData(direction=direction, speed=speed), WindDataSource.TAF
+
+
+def get_wind_data(
+        db: Database,
+        airport_icao: str,
+        before_timestamp: int
+) -> tuple[WindData, WindDataSource] | None:
+    """
+    Returns None if the slot of `before_timestamp` has not been materialized, e.g. for reports
+    stored before the timeline was enabled and not rebuilt since, so that the caller falls back
+    to the stored reports.
+    """
+    slot_id = _slot_id(airport_icao, slot_timestamp(before_timestamp))
+    timeline_slot = db[TIMELINE_COLLECTION].find_one({'_id': slot_id})
+
+    if timeline_slot is None:
+        return None
+
+    result = _resolve(timeline_slot, before_timestamp)
+    if result is None:
+        raise METNotAvailable()
+
+    return result
+
+
+def rebuild(db: Database, airport_icao: str | None = None):
+    query = {} if airport_icao is None else {'airport_icao': airport_icao}
+
+    db[TIMELINE_COLLECTION].delete_many(query)
+
+    slots_per_airport = defaultdict(set)
+    for metar in db[METAR_COLLECTION].find(
+            query, projection={'airport_icao': True, 'time': True, 'created_at': True}):
+        slots_per_airport[metar['airport_icao']].update(
+            metar_slots(metar['time'], _created_at(metar))
+        )
+    for taf in db[TAF_COLLECTION].find(
+            query, projection={'airport_icao': True, 'start_time': True, 'end_time': True,
+                               'created_at': True}):
+        slots_per_airport[taf['airport_icao']].update(
+            taf_slots(taf['start_time'], taf['end_time'], _created_at(taf))
+        )
+
+    for icao, slots in slots_per_airport.items():
+        slots = sorted(slots)
+
+        for i in range(0, len(slots), REBUILD_CHUNK_SLOTS):
+            refresh(db, icao, slots[i:i + REBUILD_CHUNK_SLOTS])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=DESCRIPTION,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('action', choices=('enable', 'disable', 'rebuild'))
+    parser.add_argument('--db', required=True)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=27017)
+    parser.add_argument('--airport', help='rebuild the timeline of this airport only')
+    args = parser.parse_args()
+
+    # same UUID representation as the one mongoengine uses for the documents' ids
+    db = MongoClient(host=args.host, port=args.port, uuidRepresentation='pythonLegacy')[args.db]
+
+    if args.action == 'enable':
+        enable(db)
+    elif args.action == 'disable':
+        disable(db)
+    else:
+        rebuild(db, airport_icao=args.airport)
+
+
+if __name__ == '__main__':
+    main()
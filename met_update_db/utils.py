@@ -48,3 +48,11 @@ def datetime_from_string(datetime_string: str) -> datetime.datetime:
 
 def datetime_from_string_with_ms(datetime_string: str) -> datetime.datetime:
     return datetime.datetime.strptime(datetime_string, "%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def datetime_from_complex_string(datetime_string: str) -> datetime.datetime:
+    return datetime.datetime.strptime(datetime_string, "%Y,%m,%d,%H,%M,%S,%f")
+
+
+def datetime_to_complex_string(value: datetime.datetime) -> str:
+    return value.strftime("%Y,%m,%d,%H,%M,%S,%f")
@@ -0,0 +1,127 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Type
+
+from mongoengine import Document
+
+from met_update_db.orm import Metar, Taf
+from met_update_db.wind_table import WindTableWriter
+
+logger = logging.getLogger(__name__)
+
+_ready = threading.Event()
+
+
+@dataclass
+class WarmUpReport:
+    duration_seconds: float
+    metars: int
+    tafs: int
+    # among the requested airports, for information only
+    airports_without_data: list[str] = field(default_factory=list)
+
+
+def _latest_per_airport(document_class: Type[Document],
+                        airport_icaos: list[str] | None) -> dict[str, dict]:
+    pipeline = []
+    if airport_icaos is not None:
+        pipeline.append({'$match': {'airport_icao': {'$in': airport_icaos}}})
+
+    pipeline += [
+        {'$sort': {'airport_icao': 1, 'created_at': -1}},
+        {'$group': {'_id': '$airport_icao', 'latest': {'$first': '$$ROOT'}}},
+    ]
+
+    return {
+        result['_id']: result['latest']
+        for result in document_class.objects.aggregate(pipeline, allowDiskUse=True)
+    }
+
+
+def warm_up(airport_icaos: Iterable[str] | None = None,
+            wind_table_writer: WindTableWriter | None = None) -> WarmUpReport:
+    """
+    Loads the latest METAR and TAF of the given airports (all by default) with one aggregation
+    per collection and populates the wind table of `wind_table_writer` with them, if given.
+    Once done, `is_ready` returns True.
+
+    Only that wind table is warmed: the negative cache is keyed by lookup time windows which
+    are not known in advance, the timeline is materialized in the database, and a wind table
+    attached with `wind_table.attach` is read-only (its updater populates it).
+    """
+    start, started_at = time.perf_counter(), time.time()
+    airport_icaos = None if airport_icaos is None else list(airport_icaos)
+
+    latest_metars = _latest_per_airport(Metar, airport_icaos)
+    latest_tafs = _latest_per_airport(Taf, airport_icaos)
+
+    if wind_table_writer is not None:
+        for airport_icao in latest_metars.keys() | latest_tafs.keys():
+            wind_table_writer.write(airport_icao,
+                                    metar=latest_metars.get(airport_icao),
+                                    taf=latest_tafs.get(airport_icao))
+        wind_table_writer.mark_refreshed(started_at)
+
+    airports_without_data = sorted(
+        set(airport_icaos or []) - latest_metars.keys() - latest_tafs.keys()
+    )
+
+    report = WarmUpReport(
+        duration_seconds=time.perf_counter() - start,
+        metars=len(latest_metars),
+        tafs=len(latest_tafs),
+        airports_without_data=airports_without_data
+    )
+    logger.info(f"warm-up loaded {report.metars} METARs and {report.tafs} TAFs "
+                f"in {report.duration_seconds:.3f}s")
+
+    _ready.set()
+
+    return report
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def wait_until_ready(timeout: float | None = None) -> bool:
+    return _ready.wait(timeout)
@@ -0,0 +1,85 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+from dataclasses import dataclass
+from enum import Enum
+
+from met_update_db.utils import datetime_from_string
+
+
+class WindDataSource(Enum):
+    METAR = 'METAR'
+    TAF = 'TAF'
+
+
+@dataclass
+class WindData:
+    direction: float
+    speed: float
+
+
+class METNotAvailable(Exception):
+    ...
+
+
+def _get_wind_value(content: dict, value_key: str) -> float | None:
+    try:
+        result = float(content[value_key]['value'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        result = None
+
+    return result
+
+
+def _get_taf_wind_value(taf_content: dict, before_timestamp: int, value_key: str) -> float | None:
+
+    backup = None
+    for forecast_item in taf_content.get('forecast', []):
+        wind_value = _get_wind_value(content=forecast_item, value_key=value_key)
+
+        if wind_value is None:
+            continue
+
+        start_time_timestamp = datetime_from_string(forecast_item['start_time']['dt']).timestamp()
+        end_time_timestamp = datetime_from_string(forecast_item['end_time']['dt']).timestamp()
+
+        if start_time_timestamp <= before_timestamp <= end_time_timestamp:
+            return wind_value
+
+        backup = wind_value
+
+    return backup
@@ -0,0 +1,107 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+# Projection of wind observations onto runway headings, vectorized over observations and runways.
+
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+from met_update_db.wind import WindData
+
+
+@dataclass
+class WindComponents:
+    # all of shape (observations, runways), in the unit of the wind speed
+    headwind: np.ndarray
+    tailwind: np.ndarray
+    # positive when the wind blows from the right of the runway heading
+    crosswind: np.ndarray
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _as_float_array(values) -> np.ndarray:
+    values = np.asarray(values)
+
+    if values.dtype.kind in 'biuf':
+        return values.astype(float, copy=False)
+
+    # missing (None) or invalid (e.g. 'VRB') values, which `_get_wind_value` maps to None,
+    # become NaN
+    return np.array([_to_float(value) for value in values.ravel()], dtype=float) \
+        .reshape(values.shape)
+
+
+def wind_components(directions: Sequence[float | None] | np.ndarray,
+                    speeds: Sequence[float | None] | np.ndarray,
+                    runway_headings: Sequence[float] | np.ndarray) -> WindComponents:
+    """
+    Computes the components of every wind observation (direction the wind blows from in degrees
+    and speed) for every runway heading in degrees. The observations with missing (e.g.
+    variable) direction or speed get NaN components.
+    """
+    directions = _as_float_array(directions)
+    speeds = _as_float_array(speeds)
+    runway_headings = np.asarray(runway_headings, dtype=float)
+
+    if directions.shape != speeds.shape:
+        raise ValueError('directions and speeds must have the same length')
+
+    angles = np.radians(directions[:, np.newaxis] - runway_headings[np.newaxis, :])
+    along = speeds[:, np.newaxis] * np.cos(angles)
+
+    return WindComponents(
+        headwind=np.maximum(along, 0.),
+        tailwind=np.maximum(-along, 0.),
+        crosswind=speeds[:, np.newaxis] * np.sin(angles)
+    )
+
+
+def wind_data_components(wind_data: Sequence[WindData | None],
+                         runway_headings: Sequence[float] | np.ndarray) -> WindComponents:
+    return wind_components(
+        directions=[None if data is None else data.direction for data in wind_data],
+        speeds=[None if data is None else data.speed for data in wind_data],
+        runway_headings=runway_headings
+    )
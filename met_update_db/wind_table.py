@@ -0,0 +1,432 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import argparse
+import datetime
+import math
+import mmap
+import os
+import struct
+import time
+import zlib
+from pathlib import Path
+
+from mongoengine import connect
+
+from met_update_db.orm import Metar, Taf
+from met_update_db.utils import datetime_from_string, datetime_from_complex_string
+from met_update_db.wind import WindData, WindDataSource, METNotAvailable, _get_wind_value
+
+DESCRIPTION = """
+Memory-mapped table of the latest METAR and TAF wind per airport, shared by processes.
+
+A single updater process keeps the table up to date from the database, while any number of
+worker processes read it lock-free: every slot carries a sequence number which the writer makes
+odd while it updates the slot, so that readers retry when it is odd or changed during their read
+(seqlock). Each slot holds the wind of the latest METAR and the forecast items of the latest TAF
+of an airport, which is enough to resolve `get_wind_data` for timestamps after their creation:
+
+- the latest METAR wins if it was observed within the two hours before the timestamp,
+- otherwise the latest TAF, if valid at the timestamp, is resolved like `repo.get_taf_wind_data`.
+
+Lookups that need older reports (e.g. historical timestamps, or a latest TAF that is not valid
+yet) cannot be answered from the table and fall back to the database. So do all the lookups once
+the table has not been refreshed for longer than its `max_age_seconds`, e.g. because the updater
+is down, since newer reports may have been stored meanwhile. The updater refreshes the airports
+with reports stored since its previous pass, by their `ingested_at`.
+
+    python -m met_update_db.wind_table --path /dev/shm/met-wind-table --db met-update
+"""
+
+MAGIC = b'MWT2'
+DEFAULT_CAPACITY = 4096
+MAX_FORECAST_ITEMS = 32
+METAR_VALIDITY_SECONDS = 2 * 60 * 60
+DEFAULT_INTERVAL_SECONDS = 30
+# the table is marked as refreshed at the start of a pass, so that it stays fresh until the end of
+# the next pass as long as the passes take less than an interval
+MAX_AGE_INTERVALS = 2
+# tolerated clock difference between the ingesters and the updater
+INGEST_CLOCK_SKEW_SECONDS = 60
+
+HAS_METAR = 1
+HAS_TAF = 2
+# the latest TAF has more than MAX_FORECAST_ITEMS forecast items
+TAF_TRUNCATED = 4
+
+# magic, capacity, max age, refreshed at
+HEADER = struct.Struct('<4sI2d')
+SEQUENCE = struct.Struct('<Q')
+# icao, flags, metar time, created_at, direction, speed, taf start_time, end_time, created_at,
+# forecast items count
+SLOT_FIELDS = struct.Struct('<4sI4d3dI4x')
+# start_time, end_time, direction, speed
+FORECAST_ITEM = struct.Struct('<4d')
+
+SLOT_PAYLOAD_SIZE = SLOT_FIELDS.size + MAX_FORECAST_ITEMS * FORECAST_ITEM.size
+SLOT_SIZE = SEQUENCE.size + SLOT_PAYLOAD_SIZE
+EMPTY_ICAO = b'\x00' * 4
+
+
+def _wind_value(content: dict, value_key: str) -> float:
+    value = _get_wind_value(content, value_key)
+
+    return math.nan if value is None else value
+
+
+def _timestamp(value: datetime.datetime | str) -> float:
+    # `created_at` is a `ComplexDateTimeField`, stored as string
+    if isinstance(value, str):
+        value = datetime_from_complex_string(value)
+
+    return value.timestamp()
+
+
+def _slot_offset(index: int) -> int:
+    return HEADER.size + index * SLOT_SIZE
+
+
+def _probe(capacity: int, airport_icao: bytes):
+    start = zlib.crc32(airport_icao) % capacity
+
+    for i in range(capacity):
+        yield (start + i) % capacity
+
+
+class WindTableWriter:
+
+    def __init__(self,
+                 path: str | Path,
+                 capacity: int = DEFAULT_CAPACITY,
+                 max_age_seconds: float = MAX_AGE_INTERVALS * DEFAULT_INTERVAL_SECONDS):
+        size = HEADER.size + capacity * SLOT_SIZE
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            self._mm = mmap.mmap(fd, size, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+
+        magic, existing_capacity, _, _ = HEADER.unpack_from(self._mm, 0)
+        if (magic, existing_capacity) != (MAGIC, capacity):
+            self._mm[:] = bytes(size)
+            # never refreshed, i.e. stale
+            HEADER.pack_into(self._mm, 0, MAGIC, capacity, max_age_seconds, 0)
+
+        self.capacity = capacity
+        self.max_age_seconds = max_age_seconds
+
+    def _slot_index(self, airport_icao: bytes) -> int:
+        for index in _probe(self.capacity, airport_icao):
+            icao_offset = _slot_offset(index) + SEQUENCE.size
+            icao = self._mm[icao_offset:icao_offset + 4]
+
+            if icao in (airport_icao, EMPTY_ICAO):
+                return index
+
+        raise ValueError(f"wind table is full ({self.capacity} airports)")
+
+    def write(self, airport_icao: str, metar: dict | None, taf: dict | None):
+        """
+        Stores the wind of the raw `metar` and `taf` documents (as returned by pymongo) as the
+        latest ones of `airport_icao`
+        """
+        icao = airport_icao.encode('ascii')
+        flags = 0
+        metar_fields = (math.nan,) * 4
+        taf_fields = (math.nan,) * 3
+        forecast_items = []
+
+        if metar is not None:
+            flags |= HAS_METAR
+            metar_fields = (
+                _timestamp(metar['time']),
+                _timestamp(metar['created_at']),
+                _wind_value(metar['content'], 'wind_direction'),
+                _wind_value(metar['content'], 'wind_speed'),
+            )
+
+        if taf is not None:
+            flags |= HAS_TAF
+            taf_fields = (
+                _timestamp(taf['start_time']),
+                _timestamp(taf['end_time']),
+                _timestamp(taf['created_at']),
+            )
+            # the items without wind have no times to read, see `_get_taf_wind_value`
+            forecast = [
+                item for item in taf['content'].get('forecast', [])
+                if _get_wind_value(item, 'wind_direction') is not None
+                or _get_wind_value(item, 'wind_speed') is not None
+            ]
+            if len(forecast) > MAX_FORECAST_ITEMS:
+                flags |= TAF_TRUNCATED
+
+            forecast_items = [
+                (
+                    datetime_from_string(item['start_time']['dt']).timestamp(),
+                    datetime_from_string(item['end_time']['dt']).timestamp(),
+                    _wind_value(item, 'wind_direction'),
+                    _wind_value(item, 'wind_speed'),
+                )
+                for item in forecast[:MAX_FORECAST_ITEMS]
+            ]
+
+        offset = _slot_offset(self._slot_index(icao))
+        sequence, = SEQUENCE.unpack_from(self._mm, offset)
+
+        SEQUENCE.pack_into(self._mm, offset, sequence + 1)
+
+        payload_offset = offset + SEQUENCE.size
+        SLOT_FIELDS.pack_into(self._mm, payload_offset,
+                              icao, flags, *metar_fields, *taf_fields, len(forecast_items))
+        for i, item in enumerate(forecast_items):
+            FORECAST_ITEM.pack_into(self._mm,
+                                    payload_offset + SLOT_FIELDS.size + i * FORECAST_ITEM.size,
+                                    *item)
+
+        SEQUENCE.pack_into(self._mm, offset, sequence + 2)
+
+    def refresh(self, airport_icao: str):
+        self.write(
+            airport_icao,
+            metar=Metar.objects(airport_icao=airport_icao).order_by('-created_at').as_pymongo()
+                .first(),
+            taf=Taf.objects(airport_icao=airport_icao).order_by('-created_at').as_pymongo().first()
+        )
+
+    def mark_refreshed(self, refreshed_at: float):
+        """
+        Records that the table holds the latest reports stored up to `refreshed_at` (a unix
+        timestamp), which keeps it fresh for `max_age_seconds` from then.
+        """
+        HEADER.pack_into(self._mm, 0, MAGIC, self.capacity, self.max_age_seconds, refreshed_at)
+
+    def close(self):
+        self._mm.close()
+
+
+def _resolve_taf_value(forecast_items: list[tuple], before_timestamp: int, value_index: int):
+    # same as `repo._get_taf_wind_value`
+    backup = math.nan
+    for item in forecast_items:
+        value = item[value_index]
+
+        if math.isnan(value):
+            continue
+
+        if item[0] <= before_timestamp <= item[1]:
+            return value
+
+        backup = value
+
+    return backup
+
+
+class WindTableReader:
+
+    def __init__(self, path: str | Path, max_retries: int = 100):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.capacity, _, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a wind table")
+
+        self.max_retries = max_retries
+
+    def _read_payload(self, offset: int) -> bytes | None:
+        for _ in range(self.max_retries):
+            sequence, = SEQUENCE.unpack_from(self._mm, offset)
+            if sequence % 2:
+                continue
+
+            payload = self._mm[offset + SEQUENCE.size:offset + SLOT_SIZE]
+
+            if SEQUENCE.unpack_from(self._mm, offset)[0] == sequence:
+                return payload
+
+        return None
+
+    def is_stale(self) -> bool:
+        _, _, max_age_seconds, refreshed_at = HEADER.unpack_from(self._mm, 0)
+
+        return time.time() - refreshed_at > max_age_seconds
+
+    def _read_slot(self, airport_icao: str) -> bytes | None:
+        icao = airport_icao.encode('ascii')
+
+        for index in _probe(self.capacity, icao):
+            offset = _slot_offset(index)
+            slot_icao = self._mm[offset + SEQUENCE.size:offset + SEQUENCE.size + 4]
+
+            if slot_icao == EMPTY_ICAO:
+                return None
+
+            if slot_icao == icao:
+                return self._read_payload(offset)
+
+        return None
+
+    def lookup(self,
+               airport_icao: str,
+               before_timestamp: int) -> tuple[WindData, WindDataSource] | None:
+        """
+        Returns None if the lookup cannot be answered from the table, and raises METNotAvailable
+        if there is no wind data according to the latest reports.
+        """
+        if self.is_stale():
+            return None
+
+        payload = self._read_slot(airport_icao)
+        if payload is None:
+            return None
+
+        (_, flags,
+         metar_time, metar_created_at, metar_direction, metar_speed,
+         taf_start_time, taf_end_time, taf_created_at, forecast_items_count) \
+            = SLOT_FIELDS.unpack_from(payload, 0)
+
+        if flags & HAS_METAR:
+            if before_timestamp < metar_created_at:
+                return None
+
+            if metar_time <= before_timestamp <= metar_time + METAR_VALIDITY_SECONDS \
+                    and not math.isnan(metar_direction) and not math.isnan(metar_speed):
+                return WindData(direction=metar_direction, speed=metar_speed), \
+                    WindDataSource.METAR
+
+        if not flags & HAS_TAF:
+            raise METNotAvailable()
+
+        if before_timestamp < taf_created_at or flags & TAF_TRUNCATED:
+            return None
+
+        # an older TAF might be valid at the timestamp
+        if not taf_start_time <= before_timestamp <= taf_end_time:
+            return None
+
+        forecast_items = [
+            FORECAST_ITEM.unpack_from(payload, SLOT_FIELDS.size + i * FORECAST_ITEM.size)
+            for i in range(forecast_items_count)
+        ]
+        direction = _resolve_taf_value(forecast_items, before_timestamp, value_index=2)
+        speed = _resolve_taf_value(forecast_items, before_timestamp, value_index=3)
+
+        if math.isnan(direction) or math.isnan(speed):
+            raise METNotAvailable()
+
+        return WindData(direction=direction, speed=speed), WindDataSource.TAF
+
+    def close(self):
+        self._mm.close()
+
+
+_reader: WindTableReader | None = None
+
+
+def attach(path: str | Path):
+    global _reader
+    _reader = WindTableReader(path)
+
+
+def detach():
+    global _reader
+
+    if _reader is not None:
+        _reader.close()
+    _reader = None
+
+
+def lookup(airport_icao: str, before_timestamp: int) -> tuple[WindData, WindDataSource] | None:
+    reader = _reader
+
+    if reader is None:
+        return None
+
+    return reader.lookup(airport_icao, before_timestamp)
+
+
+def _airports_ingested_since(since: datetime.datetime) -> set[str]:
+    return set(Metar.objects(ingested_at__gte=since).distinct('airport_icao')) \
+        | set(Taf.objects(ingested_at__gte=since).distinct('airport_icao'))
+
+
+def run_updater(writer: WindTableWriter, interval_seconds: float):
+    since = None
+
+    while True:
+        pass_started_at, refreshed_at = datetime.datetime.utcnow(), time.time()
+
+        if since is None:
+            # everything at first, including the reports stored without `ingested_at`
+            airport_icaos = set(Metar.objects.distinct('airport_icao')) \
+                | set(Taf.objects.distinct('airport_icao'))
+        else:
+            airport_icaos = _airports_ingested_since(since)
+
+        for airport_icao in airport_icaos:
+            writer.refresh(airport_icao)
+        writer.mark_refreshed(refreshed_at)
+
+        since = pass_started_at - datetime.timedelta(seconds=INGEST_CLOCK_SKEW_SECONDS)
+        # the passes start every interval, see `MAX_AGE_INTERVALS`
+        time.sleep(max(interval_seconds - (time.time() - refreshed_at), 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=DESCRIPTION,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', required=True)
+    parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY)
+    parser.add_argument('--db', required=True)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=27017)
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL_SECONDS)
+    args = parser.parse_args()
+
+    connect(db=args.db, host=args.host, port=args.port)
+    writer = WindTableWriter(args.path,
+                             capacity=args.capacity,
+                             max_age_seconds=MAX_AGE_INTERVALS * args.interval)
+    run_updater(writer, args.interval)
+
+
+if __name__ == '__main__':
+    main()
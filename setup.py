@@ -22,6 +22,9 @@ setuptools.setup(
         'pymongo',
         'mongoengine'
     ],
+    extras_require={
+        'numpy': ['numpy']
+    },
     tests_require=[
         'pytest',
         'pytest-cov'
@@ -71,3 +71,21 @@ def sample_metar_data():
     metar_file = next(metar_files_dir.glob("*.json"))
     with metar_file.open('r') as f:
         return json.load(f)
+
+
+@pytest.fixture(scope='function')
+def all_taf_data():
+    result = []
+    for taf_file in sorted(taf_files_dir.glob("*.json")):
+        with taf_file.open('r') as f:
+            result.append(json.load(f))
+    return result
+
+
+@pytest.fixture(scope='function')
+def all_metar_data():
+    result = []
+    for metar_file in sorted(metar_files_dir.glob("*.json")):
+        with metar_file.open('r') as f:
+            result.append(json.load(f))
+    return result
@@ -0,0 +1,200 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+from unittest import mock
+
+import pytest
+from mongoengine import connection
+
+from met_update_db import repo, timeline
+from met_update_db.cache import NegativeCache, negative_cache, NegativeCacheStats
+from met_update_db.utils import datetime_from_string
+
+
+@pytest.fixture
+def enable_negative_cache():
+    negative_cache.configure(ttl_seconds=60)
+    yield
+    negative_cache.configure(ttl_seconds=0)
+
+
+def test_negative_cache__disabled__never_contains():
+    cache = NegativeCache(ttl_seconds=0)
+    cache.add('EHAM', 1000)
+
+    assert not cache.contains('EHAM', 1000)
+    assert len(cache) == 0
+
+
+def test_negative_cache__contains_the_exact_timestamps_only():
+    cache = NegativeCache(ttl_seconds=60)
+    cache.add('EHAM', 1000)
+
+    assert cache.contains('EHAM', 1000)
+    assert not cache.contains('EHAM', 1001)
+    assert not cache.contains('EBBR', 1000)
+    assert cache.stats == NegativeCacheStats(hits=1, misses=2)
+
+
+@mock.patch('met_update_db.cache.time.monotonic')
+def test_negative_cache__entries_expire_after_ttl(mock_monotonic):
+    mock_monotonic.return_value = 0
+    cache = NegativeCache(ttl_seconds=10)
+    cache.add('EHAM', 1000)
+
+    mock_monotonic.return_value = 10
+    assert not cache.contains('EHAM', 1000)
+    assert cache.stats.expirations == 1
+    assert len(cache) == 0
+
+
+def test_negative_cache__least_recently_used_entries_are_evicted():
+    cache = NegativeCache(ttl_seconds=60, maxsize=2)
+    cache.add('EHAM', 1)
+    cache.add('EBBR', 1)
+    cache.contains('EHAM', 1)
+    cache.add('LFPG', 1)
+
+    assert cache.contains('EHAM', 1)
+    assert not cache.contains('EBBR', 1)
+    assert cache.stats.evictions == 1
+
+
+def test_negative_cache__invalidate__drops_all_entries_of_the_airport():
+    cache = NegativeCache(ttl_seconds=60)
+    cache.add('EHAM', 1)
+    cache.add('EHAM', 2)
+    cache.add('EBBR', 1)
+
+    cache.invalidate('EHAM')
+
+    assert not cache.contains('EHAM', 1)
+    assert not cache.contains('EHAM', 2)
+    assert cache.contains('EBBR', 1)
+    assert cache.stats.invalidations == 2
+
+
+@mock.patch('met_update_db.repo.resolve_wind_data')
+def test_get_wind_data__no_data__is_served_from_the_negative_cache(
+        mock_resolve_wind_data, enable_negative_cache
+):
+    mock_resolve_wind_data.return_value = None
+
+    for _ in range(3):
+        with pytest.raises(repo.METNotAvailable):
+            repo.get_wind_data('EHAM', before_timestamp=1000)
+
+    mock_resolve_wind_data.assert_called_once()
+    assert negative_cache.stats.hits == 2
+
+
+@mock.patch('met_update_db.repo.resolve_wind_data')
+def test_add_metar__invalidates_the_negative_cache(
+        mock_resolve_wind_data, enable_negative_cache, sample_metar_data
+):
+    mock_resolve_wind_data.return_value = None
+    with pytest.raises(repo.METNotAvailable):
+        repo.get_wind_data('EHAM', before_timestamp=1000)
+
+    repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+
+    assert not negative_cache.contains('EHAM', 1000)
+
+
+def test_negative_cache__add__stale_generation__is_not_recorded():
+    cache = NegativeCache(ttl_seconds=60)
+    generation = cache.generation('EHAM')
+
+    cache.invalidate('EHAM')
+    cache.add('EHAM', 1000, generation)
+    assert not cache.contains('EHAM', 1000)
+    assert cache.stats.stale_adds == 1
+
+    cache.add('EHAM', 1000, cache.generation('EHAM'))
+    assert cache.contains('EHAM', 1000)
+
+
+def test_get_wind_data__metar_added_while_querying__is_not_hidden_by_the_negative_cache(
+        enable_negative_cache, sample_metar_data
+):
+    timestamp = int(datetime_from_string(sample_metar_data['time']['dt']).timestamp()) + 600
+
+    def add_metar_and_find_nothing(*args):
+        repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+        return None
+
+    with mock.patch('met_update_db.repo.resolve_wind_data',
+                    side_effect=add_metar_and_find_nothing):
+        with pytest.raises(repo.METNotAvailable):
+            repo.get_wind_data('EHAM', before_timestamp=timestamp)
+
+    assert not negative_cache.contains('EHAM', timestamp)
+    assert repo.get_wind_data('EHAM', before_timestamp=timestamp)[1] == repo.WindDataSource.METAR
+
+
+def test_add_metar__timeline_enabled__invalidates_the_negative_cache_after_the_refresh(
+        enable_negative_cache, sample_metar_data
+):
+    slot_counts = []
+
+    def count_slots(_):
+        slot_counts.append(
+            connection.get_db()[timeline.TIMELINE_COLLECTION].count_documents({})
+        )
+
+    timeline.enable(connection.get_db())
+    try:
+        with mock.patch.object(negative_cache, 'invalidate', side_effect=count_slots):
+            repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+    finally:
+        timeline.disable(connection.get_db())
+
+    assert len(slot_counts) == 1 and slot_counts[0] > 0
+
+
+def test_get_wind_data__miss_after_the_end_of_a_metar_validity__does_not_hide_it(
+        enable_negative_cache, sample_metar_data
+):
+    repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+    end_of_validity = int(datetime_from_string(sample_metar_data['time']['dt']).timestamp()) \
+        + 2 * 60 * 60
+
+    with pytest.raises(repo.METNotAvailable):
+        repo.get_wind_data('EHAM', before_timestamp=end_of_validity + 30)
+
+    assert repo.get_wind_data('EHAM', before_timestamp=end_of_validity) \
+           == repo.resolve_wind_data('EHAM', end_of_validity)
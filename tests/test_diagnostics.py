@@ -0,0 +1,155 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import logging
+from unittest import mock
+
+import pytest
+
+from met_update_db import diagnostics, repo
+from met_update_db.diagnostics import SlowQueryConfig
+from met_update_db.orm import Metar
+
+EXPLAIN = {
+    'queryPlanner': {
+        'winningPlan': {
+            'stage': 'LIMIT',
+            'inputStage': {
+                'stage': 'FETCH',
+                'inputStage': {
+                    'stage': 'IXSCAN',
+                    'indexName': 'created_at_1',
+                }
+            }
+        }
+    },
+    'executionStats': {
+        'nReturned': 1,
+        'executionTimeMillis': 120,
+        'totalKeysExamined': 5000,
+        'totalDocsExamined': 5000,
+    }
+}
+
+
+@pytest.fixture(autouse=True)
+def disable_slow_query_log():
+    yield
+    diagnostics.disable_slow_query_log()
+
+
+def test_summarize_explain():
+    assert diagnostics._summarize_explain(EXPLAIN) == {
+        'plan_stages': ['LIMIT', 'FETCH', 'IXSCAN(created_at_1)'],
+        'docs_examined': 5000,
+        'keys_examined': 5000,
+        'n_returned': 1,
+        'execution_time_ms': 120,
+    }
+
+
+@mock.patch('met_update_db.diagnostics._explain')
+def test_track_query__disabled__nothing_is_logged(mock_explain, caplog):
+    repo.get_taf('EHAM', before_timestamp=0)
+
+    mock_explain.assert_not_called()
+    assert not caplog.records
+
+
+@mock.patch('met_update_db.diagnostics._explain')
+def test_track_query__below_threshold__nothing_is_logged(mock_explain, caplog):
+    diagnostics.enable_slow_query_log(SlowQueryConfig(threshold_ms=60_000))
+
+    repo.get_taf('EHAM', before_timestamp=0)
+
+    mock_explain.assert_not_called()
+    assert not caplog.records
+
+
+@mock.patch('met_update_db.diagnostics._explain')
+def test_track_query__slow_query__logs_explain_summary(mock_explain, caplog):
+    mock_explain.return_value = EXPLAIN
+    diagnostics.enable_slow_query_log(SlowQueryConfig(threshold_ms=0))
+
+    with caplog.at_level(logging.WARNING, logger='met_update_db.diagnostics'):
+        repo.get_metar('EHAM', before_timestamp=0)
+
+    [record] = caplog.records
+    assert record.slow_query['query'] == 'get_metar'
+    assert record.slow_query['collection'] == 'metar'
+    assert record.slow_query['plan_stages'] == ['LIMIT', 'FETCH', 'IXSCAN(created_at_1)']
+    assert record.slow_query['limit'] == 1
+    assert record.slow_query['docs_examined'] == 5000
+    mock_explain.assert_called_once_with(mock.ANY, 1)
+
+
+def test_explain__is_limited_and_sorted_as_the_query():
+    queryset = Metar.objects(airport_icao='EHAM').order_by('-created_at')
+
+    with mock.patch.object(type(queryset._collection.database), 'command') as mock_command:
+        diagnostics._explain(queryset, limit=1)
+
+    (name, command), kwargs = mock_command.call_args
+    assert name == 'explain'
+    assert command == {'find': 'metar',
+                       'filter': {'airport_icao': 'EHAM'},
+                       'sort': {'created_at': -1},
+                       'limit': 1}
+    assert kwargs == {'verbosity': 'executionStats'}
+
+
+@mock.patch('met_update_db.diagnostics._explain')
+def test_track_query__slow_queries__are_rate_limited(mock_explain, caplog):
+    mock_explain.return_value = EXPLAIN
+    diagnostics.enable_slow_query_log(SlowQueryConfig(threshold_ms=0, max_reports_per_minute=2))
+
+    with caplog.at_level(logging.WARNING, logger='met_update_db.diagnostics'):
+        for _ in range(5):
+            repo.get_metar('EHAM', before_timestamp=0)
+
+    assert mock_explain.call_count == 2
+    assert len(caplog.records) == 2
+
+
+@mock.patch('met_update_db.diagnostics._explain')
+def test_track_query__not_sampled__nothing_is_logged(mock_explain, caplog):
+    diagnostics.enable_slow_query_log(SlowQueryConfig(threshold_ms=0, sample_rate=0))
+
+    repo.get_metar('EHAM', before_timestamp=0)
+
+    mock_explain.assert_not_called()
+    assert not caplog.records
@@ -0,0 +1,200 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import threading
+import time
+from unittest import mock
+
+import pytest
+from mongoengine import connect, disconnect
+from mongoengine.connection import get_connection
+from pymongo.monitoring import ConnectionPoolListener
+
+from met_update_db import repo
+from met_update_db.executor import WindLookupExecutor, WindLookupTimeout
+from met_update_db.utils import datetime_from_string
+from tests import config
+
+AIRPORTS = ['EHAM', 'EBBR', 'LFPG', 'EDDF', 'LEMD']
+
+
+@pytest.fixture
+def metars_for_several_airports(sample_metar_data):
+    for airport_icao in AIRPORTS:
+        repo.add_metar(metar_data=sample_metar_data, airport_icao=airport_icao)
+
+    return int(datetime_from_string(sample_metar_data['time']['dt']).timestamp())
+
+
+def test_wind_lookup_executor__max_workers_is_capped_to_the_connection_pool_size():
+    max_pool_size = get_connection().options.pool_options.max_pool_size
+
+    with WindLookupExecutor(max_workers=max_pool_size + 1) as executor:
+        assert executor.max_workers == max_pool_size
+
+
+def test_wind_lookup_executor__concurrent_lookups__results_are_returned_in_order(
+        metars_for_several_airports
+):
+    metar_timestamp = metars_for_several_airports
+    lookups = [
+        (airport_icao, metar_timestamp + offset)
+        for offset in range(0, 600, 30)
+        for airport_icao in AIRPORTS + ['LGAV']
+    ]
+
+    expected = []
+    for airport_icao, before_timestamp in lookups:
+        try:
+            expected.append(repo.get_wind_data(airport_icao, before_timestamp))
+        except repo.METNotAvailable:
+            expected.append(None)
+
+    with WindLookupExecutor(max_workers=8, timeout=10) as executor:
+        assert executor.get_wind_data(lookups) == expected
+
+
+@mock.patch('met_update_db.repo.get_wind_data')
+def test_wind_lookup_executor__lookup_exceeds_timeout__raises_windlookuptimeout(
+        mock_get_wind_data
+):
+    mock_get_wind_data.side_effect = lambda *args: time.sleep(0.5)
+
+    with WindLookupExecutor(max_workers=2, timeout=0.1) as executor:
+        with pytest.raises(WindLookupTimeout):
+            executor.get_wind_data([('EHAM', 0), ('EBBR', 0)])
+
+
+@mock.patch('met_update_db.repo.get_wind_data')
+def test_wind_lookup_executor__timeout__counts_from_the_start_of_each_lookup(
+        mock_get_wind_data
+):
+    mock_get_wind_data.side_effect = lambda airport_icao, _: time.sleep(
+        0.1 if airport_icao == 'EHAM' else 0.5)
+
+    start = time.monotonic()
+    with WindLookupExecutor(max_workers=2, timeout=0.2) as executor:
+        with pytest.raises(WindLookupTimeout) as e:
+            executor.get_wind_data([('EHAM', 0), ('EBBR', 0)])
+
+        # and not 0.2s after the result of the first lookup
+        assert time.monotonic() - start < 0.25
+    assert e.value.airport_icao == 'EBBR'
+
+
+@mock.patch('met_update_db.repo.get_wind_data')
+def test_wind_lookup_executor__queued_lookups__are_not_timed_out(mock_get_wind_data):
+    mock_get_wind_data.side_effect = lambda *args: time.sleep(0.05)
+
+    start = time.monotonic()
+    with WindLookupExecutor(max_workers=2, timeout=0.2) as executor:
+        # about 0.5s overall, but each lookup runs for 0.05s
+        assert executor.get_wind_data([('EHAM', 0)] * 20) == [None] * 20
+    assert time.monotonic() - start > 0.4
+
+
+class _CheckedOutConnections(ConnectionPoolListener):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.max = 0
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.current += 1
+            self.max = max(self.max, self.current)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.current -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+
+@pytest.fixture
+def checked_out_connections():
+    listener = _CheckedOutConnections()
+
+    disconnect()
+    connect(db=config.MONGO['db'], host=config.MONGO['host'], port=config.MONGO['port'],
+            maxPoolSize=8, event_listeners=[listener])
+    yield listener
+    disconnect()
+    connect(db=config.MONGO['db'])
+
+
+def test_wind_lookup_executor__does_not_exhaust_the_connection_pool(
+        checked_out_connections, metars_for_several_airports
+):
+    metar_timestamp = metars_for_several_airports
+    lookups = [
+        (airport_icao, metar_timestamp + offset)
+        for offset in range(0, 3600, 10)
+        for airport_icao in AIRPORTS
+    ]
+
+    with WindLookupExecutor(max_workers=4, timeout=30) as executor:
+        executor.get_wind_data(lookups)
+
+    assert checked_out_connections.max <= executor.max_workers
+    assert checked_out_connections.current == 0
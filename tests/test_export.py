@@ -0,0 +1,103 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import numpy as np
+import pytest
+
+from met_update_db import repo
+from met_update_db.export import export_wind_series, WindSeries, SOURCE_CODES, NO_SOURCE
+from met_update_db.utils import datetime_from_string
+
+
+def _timestamp(datetime_string: str) -> int:
+    return int(datetime_from_string(datetime_string).timestamp())
+
+
+@pytest.fixture
+def all_reports(all_metar_data, all_taf_data):
+    for metar_data in all_metar_data:
+        repo.add_metar(metar_data=metar_data, airport_icao='EHAM')
+    for taf_data in all_taf_data:
+        repo.add_taf(taf_data=taf_data, airport_icao='EHAM')
+
+
+def test_export_wind_series__no_data__all_steps_have_no_source():
+    series = export_wind_series('EHAM', 0, 3600, 600)
+
+    assert series.timestamps.tolist() == [0, 600, 1200, 1800, 2400, 3000]
+    assert np.isnan(series.direction).all()
+    assert np.isnan(series.speed).all()
+    assert (series.source == NO_SOURCE).all()
+
+
+def test_export_wind_series__matches_resolve_wind_data_at_every_step(all_reports):
+    start_timestamp = _timestamp('2022-03-18T12:00:00Z')
+    end_timestamp = _timestamp('2022-03-20T12:00:00Z')
+
+    series = export_wind_series('EHAM', start_timestamp, end_timestamp, step_seconds=7 * 60)
+
+    assert set(series.source.tolist()) == {NO_SOURCE, *SOURCE_CODES.values()}
+    for timestamp, direction, speed, source in zip(
+            series.timestamps, series.direction, series.speed, series.source
+    ):
+        resolved = repo.resolve_wind_data('EHAM', int(timestamp))
+
+        if resolved is None:
+            assert source == NO_SOURCE
+            assert np.isnan(direction) and np.isnan(speed)
+        else:
+            wind_data, wind_data_source = resolved
+            assert (direction, speed, source) \
+                   == (wind_data.direction, wind_data.speed, SOURCE_CODES[wind_data_source])
+
+
+def test_wind_series__save_and_load(tmp_path):
+    series = WindSeries(
+        timestamps=np.array([0, 600]),
+        direction=np.array([180., np.nan]),
+        speed=np.array([10., np.nan]),
+        source=np.array([SOURCE_CODES[repo.WindDataSource.TAF], NO_SOURCE], dtype=np.int8)
+    )
+    path = tmp_path / 'series.npz'
+
+    series.save(path)
+    loaded = WindSeries.load(path)
+
+    np.testing.assert_array_equal(loaded.timestamps, series.timestamps)
+    np.testing.assert_array_equal(loaded.direction, series.direction)
+    np.testing.assert_array_equal(loaded.speed, series.speed)
+    np.testing.assert_array_equal(loaded.source, series.source)
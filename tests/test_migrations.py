@@ -0,0 +1,158 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import datetime
+import uuid
+from unittest import mock
+
+import pytest
+from mongoengine import connection
+
+from met_update_db import orm, repo
+from met_update_db.migrations import SCHEMA_VERSION
+from met_update_db.migrations.base import Migration, METAR_COLLECTION
+from met_update_db.migrations.engine import migrate, MigrationSettings, CHECKPOINT_COLLECTION
+
+SETTINGS = MigrationSettings(batch_size=2, workers=2, duty_cycle=1)
+
+AIRPORTS = ['EHAM', 'EBBR', 'LFPG']
+
+
+@pytest.fixture
+def legacy_metars():
+    metars = [
+        orm.Metar(
+            id=uuid.uuid4().hex,
+            airport_icao=airport_icao,
+            content={'meta': {}},
+            time=datetime.datetime(2022, 5, 30, hour),
+            created_at=datetime.datetime(2022, 5, 30, hour, 5)
+        )
+        for airport_icao in AIRPORTS
+        for hour in range(5)
+    ]
+    for metar in metars:
+        metar.save()
+
+    return metars
+
+
+def _add_time_epoch(document: dict) -> dict:
+    return {'time_epoch': int(document['time'].timestamp())}
+
+
+def _raw_metars() -> list[dict]:
+    return list(connection.get_db()[METAR_COLLECTION].find())
+
+
+def test_add_metar__stamps_the_current_schema_version(sample_metar_data):
+    repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+
+    assert orm.Metar.objects.get().schema_version == SCHEMA_VERSION
+
+
+def test_migrate__stamps_the_schema_version_of_legacy_documents(legacy_metars):
+    result = migrate(connection.get_db(), settings=SETTINGS)
+
+    assert result == {1: len(legacy_metars)}
+    assert {metar.schema_version for metar in orm.Metar.objects} == {SCHEMA_VERSION}
+
+
+def test_migrate__only_migrates_the_documents_of_lower_version(legacy_metars):
+    migration = Migration(version=2, description='time epoch', collections=(METAR_COLLECTION,),
+                          migrate=_add_time_epoch)
+    legacy_metars[0].update(schema_version=2)
+
+    result = migrate(connection.get_db(), settings=SETTINGS, migrations=[migration])
+
+    assert result == {2: len(legacy_metars) - 1}
+    assert {metar['schema_version'] for metar in _raw_metars()} == {2}
+    assert [metar['_id'] for metar in _raw_metars() if 'time_epoch' not in metar] \
+           == [legacy_metars[0].id]
+
+
+def test_migrate__interrupted__resumes_from_the_checkpoint(legacy_metars):
+    migrate_document = mock.Mock()
+    migration = Migration(version=2, description='time epoch', collections=(METAR_COLLECTION,),
+                          migrate=migrate_document)
+
+    # the first batch goes through and the second one fails
+    migrate_document.side_effect = [
+        _add_time_epoch(legacy_metars[0].to_mongo()),
+        _add_time_epoch(legacy_metars[0].to_mongo()),
+        RuntimeError('interrupted')
+    ]
+    with pytest.raises(RuntimeError):
+        migrate(connection.get_db(),
+                settings=MigrationSettings(batch_size=2, workers=1, duty_cycle=1),
+                migrations=[migration])
+
+    checkpoints = list(connection.get_db()[CHECKPOINT_COLLECTION].find())
+    assert [checkpoint['migrated'] for checkpoint in checkpoints] == [2]
+
+    migrate_document.reset_mock()
+    migrate_document.side_effect = _add_time_epoch
+    migrate(connection.get_db(), settings=SETTINGS, migrations=[migration])
+
+    assert migrate_document.call_count == len(legacy_metars) - 2
+    assert {metar['schema_version'] for metar in _raw_metars()} == {2}
+    assert {checkpoint['done'] for checkpoint in
+            connection.get_db()[CHECKPOINT_COLLECTION].find()} == {True}
+
+
+def test_migrate__done__migrates_the_documents_inserted_since(legacy_metars):
+    migrate(connection.get_db(), settings=SETTINGS)
+
+    # written by an instance of the previous version, with an id lower than the checkpoint
+    orm.Metar(
+        id=uuid.UUID(int=0),
+        airport_icao=AIRPORTS[0],
+        content={'meta': {}},
+        time=datetime.datetime(2022, 5, 30, 6),
+        created_at=datetime.datetime(2022, 5, 30, 6, 5)
+    ).save()
+
+    result = migrate(connection.get_db(), settings=SETTINGS)
+
+    assert result == {1: 1}
+    assert {metar.schema_version for metar in orm.Metar.objects} == {SCHEMA_VERSION}
+
+
+@pytest.mark.parametrize('duty_cycle', [0, -0.5, 1.5])
+def test_migration_settings__invalid_duty_cycle__raises_valueerror(duty_cycle):
+    with pytest.raises(ValueError):
+        MigrationSettings(duty_cycle=duty_cycle)
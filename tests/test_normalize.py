@@ -0,0 +1,206 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import copy
+import json
+
+import pytest
+
+from met_update_db import normalize, repo, sqlite_repo
+from met_update_db.normalize import NormalizationConfig, InvalidMETReport, DEFAULT_STRIP_KEYS, \
+    normalize_taf, normalize_metar
+from met_update_db.orm import Taf, Metar, RelocatedContent
+from met_update_db.utils import datetime_from_string
+from met_update_db.wind import WindData, WindDataSource, _get_taf_wind_value, _get_wind_value
+
+
+@pytest.fixture
+def configure_normalization():
+    def _configure(config):
+        normalize.configure(config)
+        normalize.stats.reset()
+
+    yield _configure
+
+    normalize.configure(None)
+    normalize.stats.reset()
+
+
+def _contains_key(value, key: str) -> bool:
+    if isinstance(value, dict):
+        return key in value or any(_contains_key(item, key) for item in value.values())
+    if isinstance(value, list):
+        return any(_contains_key(item, key) for item in value)
+    return False
+
+
+@pytest.mark.parametrize('path, error', [
+    (('meta', 'timestamp'), "TAF of EHAM is missing 'meta.timestamp'"),
+    (('start_time', 'dt'), "TAF of EHAM is missing 'start_time.dt'"),
+    (('end_time',), "TAF of EHAM is missing 'end_time.dt'"),
+])
+def test_validate_taf__missing_key__raises_invalidmetreport(sample_taf_data, path, error):
+    parent = sample_taf_data
+    for key in path[:-1]:
+        parent = parent[key]
+    del parent[path[-1]]
+
+    with pytest.raises(InvalidMETReport, match=error.replace('.', r'\.')):
+        normalize.validate_taf(sample_taf_data, 'EHAM')
+
+
+def test_validate_taf__missing_forecast_item_time__raises_invalidmetreport(sample_taf_data):
+    del sample_taf_data['forecast'][1]['end_time']
+
+    with pytest.raises(InvalidMETReport, match="forecast item 1 is missing 'end_time.dt'"):
+        normalize.validate_taf(sample_taf_data, 'EHAM')
+
+
+def test_validate_taf__missing_forecast__is_valid(sample_taf_data):
+    del sample_taf_data['forecast']
+
+    normalize.validate_taf(sample_taf_data, 'EHAM')
+
+
+def test_add_taf__item_without_wind_nor_times__is_stored_and_resolved(sample_taf_data):
+    sample_taf_data['forecast'].insert(1, {'visibility': {'value': 9999}})
+    before_timestamp = int(datetime_from_string('2022-03-19T10:30:00Z').timestamp())
+
+    repo.add_taf(taf_data=sample_taf_data, airport_icao='EHAM')
+
+    assert repo.get_wind_data('EHAM', before_timestamp) \
+           == (WindData(direction=80, speed=12), WindDataSource.TAF)
+
+
+def test_validate_metar__invalid_time__raises_invalidmetreport(sample_metar_data):
+    sample_metar_data['time']['dt'] = '181255Z'
+
+    with pytest.raises(InvalidMETReport, match="METAR of EHAM has an invalid 'time.dt'"):
+        normalize.validate_metar(sample_metar_data, 'EHAM')
+
+
+def test_normalization_config__protected_key__raises_valueerror():
+    with pytest.raises(ValueError):
+        NormalizationConfig(strip_keys=frozenset({'spoken', 'value'}))
+
+
+def test_normalize__not_configured__returns_the_report_as_is(sample_metar_data):
+    report = normalize_metar(sample_metar_data, 'EHAM')
+
+    assert report.content is sample_metar_data
+    assert report.relocated == {}
+    assert report.size_before is None
+
+
+def test_normalize_taf__strips_keys_and_keeps_the_wind(configure_normalization, all_taf_data):
+    configure_normalization(NormalizationConfig(strip_keys=DEFAULT_STRIP_KEYS))
+
+    for taf_data in all_taf_data:
+        original = copy.deepcopy(taf_data)
+        report = normalize_taf(taf_data, 'EHAM')
+
+        assert taf_data == original
+        assert not any(_contains_key(report.content, key) for key in DEFAULT_STRIP_KEYS)
+        assert report.relocated == {}
+        assert report.size_after < report.size_before
+
+        start_timestamp = int(datetime_from_string(taf_data['start_time']['dt']).timestamp())
+        end_timestamp = int(datetime_from_string(taf_data['end_time']['dt']).timestamp())
+        for timestamp in range(start_timestamp, end_timestamp, 1800):
+            for value_key in ('wind_direction', 'wind_speed'):
+                assert _get_taf_wind_value(report.content, timestamp, value_key) \
+                       == _get_taf_wind_value(taf_data, timestamp, value_key)
+
+    assert normalize.stats.reports == len(all_taf_data)
+    assert normalize.stats.bytes_saved > 0
+
+
+def test_normalize_metar__relocates_keys_by_path(configure_normalization, sample_metar_data):
+    configure_normalization(NormalizationConfig(strip_keys=frozenset({'repr'}),
+                                                relocate_keys=frozenset({'spoken'})))
+
+    report = normalize_metar(sample_metar_data, 'EHAM')
+
+    assert report.relocated['wind_speed/spoken'] == sample_metar_data['wind_speed']['spoken']
+    assert all(path.endswith('/spoken') for path in report.relocated)
+    assert not _contains_key(report.content, 'spoken')
+    assert not _contains_key(report.content, 'repr')
+    assert _get_wind_value(report.content, 'wind_speed') \
+           == _get_wind_value(sample_metar_data, 'wind_speed')
+
+
+def test_add_taf__invalid_report__is_not_stored(sample_taf_data):
+    del sample_taf_data['meta']
+
+    with pytest.raises(InvalidMETReport):
+        repo.add_taf(sample_taf_data, 'EHAM')
+
+    assert Taf.objects.count() == 0
+
+
+def test_add_metar__stores_the_normalized_report_and_the_relocated_content(
+        configure_normalization, sample_metar_data):
+    configure_normalization(NormalizationConfig(strip_keys=frozenset({'sanitized', 'repr'}),
+                                                relocate_keys=frozenset({'spoken'})))
+
+    repo.add_metar(sample_metar_data, 'EHAM')
+
+    metar = Metar.objects.first()
+    assert 'sanitized' not in metar.content
+    assert metar.content['wind_speed'] == {'value': sample_metar_data['wind_speed']['value']}
+
+    relocated_content = RelocatedContent.objects.get(id=metar.id)
+    assert relocated_content.report_type == 'METAR'
+    assert relocated_content.content['wind_speed/spoken'] \
+           == sample_metar_data['wind_speed']['spoken']
+
+
+def test_sqlite_add_taf__stores_the_normalized_report(configure_normalization, tmp_path,
+                                                      sample_taf_data):
+    configure_normalization(NormalizationConfig(strip_keys=DEFAULT_STRIP_KEYS))
+    sqlite_repo.connect(tmp_path / 'met-update.db')
+
+    try:
+        sqlite_repo.add_taf(sample_taf_data, 'EHAM')
+        content, = sqlite_repo._connection().execute('SELECT content FROM taf').fetchone()
+        relocated_rows = sqlite_repo._connection().execute(
+            'SELECT COUNT(*) FROM relocated_content').fetchone()
+    finally:
+        sqlite_repo.close()
+
+    assert not _contains_key(json.loads(content), 'spoken')
+    assert relocated_rows == (0,)
@@ -0,0 +1,131 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import datetime
+
+import pytest
+from mongoengine import connection
+
+from met_update_db import repo, orm, pymongo_repo
+from met_update_db.read_models import TafRecord, MetarRecord
+from met_update_db.utils import datetime_from_string
+
+
+@pytest.fixture(autouse=True)
+def use_database():
+    pymongo_repo.use_database(connection.get_db())
+    yield
+    pymongo_repo.use_database(None)
+
+
+def _timestamps(all_metar_data) -> range:
+    start_timestamp = int(datetime_from_string(all_metar_data[0]['time']['dt']).timestamp())
+
+    return range(start_timestamp - 3600, start_timestamp + 2 * 86400, 900)
+
+
+def test_add_taf__is_readable_by_the_orm(sample_taf_data):
+    pymongo_repo.add_taf(taf_data=sample_taf_data, airport_icao='EHAM')
+
+    taf = orm.Taf.objects.get()
+    assert taf.content == sample_taf_data
+    assert taf.created_at == datetime.datetime.strptime(sample_taf_data['meta']['timestamp'],
+                                                        "%Y-%m-%dT%H:%M:%S.%fZ")
+    assert taf.schema_version == repo.SCHEMA_VERSION
+
+
+def test_add_metar__is_readable_by_the_orm(sample_metar_data):
+    pymongo_repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+
+    metar = orm.Metar.objects.get()
+    assert metar.content == sample_metar_data
+    assert metar.time == datetime_from_string(sample_metar_data['time']['dt'])
+
+
+def test_get_taf__written_by_the_orm(sample_taf_data):
+    repo.add_taf(taf_data=sample_taf_data, airport_icao='EHAM')
+    taf = orm.Taf.objects.get()
+    before_timestamp = int(taf.created_at.timestamp()) + 60
+
+    assert pymongo_repo.get_taf('EHAM', before_timestamp) == TafRecord(
+        id=taf.id,
+        airport_icao=taf.airport_icao,
+        content=taf.content,
+        start_time=taf.start_time,
+        end_time=taf.end_time,
+        created_at=taf.created_at
+    )
+
+
+def test_get_metar__written_by_the_orm(sample_metar_data):
+    repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+    metar = orm.Metar.objects.get()
+    before_timestamp = int(metar.created_at.timestamp()) + 60
+
+    assert pymongo_repo.get_metar('EHAM', before_timestamp, fields=('id', 'time')) \
+           == MetarRecord(id=metar.id, time=metar.time)
+
+
+def test_get_taf__no_data__returns_none():
+    assert pymongo_repo.get_taf('EHAM', before_timestamp=0) is None
+    assert pymongo_repo.get_metar('EHAM', before_timestamp=0) is None
+
+
+def test_get_wind_data__matches_the_orm_repo(all_metar_data, all_taf_data):
+    for metar_data in all_metar_data:
+        pymongo_repo.add_metar(metar_data=metar_data, airport_icao='EHAM')
+    for taf_data in all_taf_data:
+        pymongo_repo.add_taf(taf_data=taf_data, airport_icao='EHAM')
+
+    for before_timestamp in _timestamps(all_metar_data):
+        try:
+            expected = repo.get_wind_data('EHAM', before_timestamp)
+        except repo.METNotAvailable:
+            with pytest.raises(repo.METNotAvailable):
+                pymongo_repo.get_wind_data('EHAM', before_timestamp)
+        else:
+            assert pymongo_repo.get_wind_data('EHAM', before_timestamp) == expected
+
+
+def test_get_last_taf_end_time(all_taf_data):
+    with pytest.raises(repo.METNotAvailable):
+        pymongo_repo.get_last_taf_end_time('EHAM')
+
+    for taf_data in all_taf_data:
+        repo.add_taf(taf_data=taf_data, airport_icao='EHAM')
+
+    assert pymongo_repo.get_last_taf_end_time('EHAM') == repo.get_last_taf_end_time('EHAM')
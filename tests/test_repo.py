@@ -42,6 +42,7 @@ from unittest import mock
 import pytest
 
 from met_update_db import repo, orm
+from met_update_db.read_models import TafRecord, MetarRecord
 from met_update_db.repo import WindDataSource, WindData
 from met_update_db.utils import datetime_from_string, datetime_from_string_with_ms
 
@@ -221,6 +222,62 @@ def test_get_metar__data_exists__satisfies_the_query__returns_metar(
     assert repo.get_metar(airport_icao='EHAM', before_timestamp=before_timestamp) == metar[0]
 
 
+def test_get_taf_record__no_data__returns_none():
+    assert repo.get_taf_record(airport_icao='EHAM', before_timestamp=get_current_timestamp()) \
+           is None
+
+
+def test_get_taf_record__data_exists__returns_record_with_the_requested_fields():
+    taf = orm.Taf(
+        id=uuid.uuid4().hex,
+        airport_icao='EHAM',
+        content={'meta': {}},
+        start_time=datetime.datetime(2022, 5, 30, 12),
+        end_time=datetime.datetime(2022, 5, 30, 22),
+        created_at=datetime.datetime(2022, 5, 30, 11, 0, 0, 123456)
+    )
+    taf.save()
+    before_timestamp = int(datetime.datetime(2022, 5, 30, 18).timestamp())
+
+    assert repo.get_taf_record('EHAM', before_timestamp) == TafRecord(
+        id=taf.id,
+        airport_icao=taf.airport_icao,
+        content=taf.content,
+        start_time=taf.start_time,
+        end_time=taf.end_time,
+        created_at=taf.created_at
+    )
+    assert repo.get_taf_record('EHAM', before_timestamp, fields=('content', 'created_at')) \
+           == TafRecord(content=taf.content, created_at=taf.created_at)
+
+
+def test_get_metar_record__no_data__returns_none():
+    assert repo.get_metar_record(airport_icao='EHAM', before_timestamp=get_current_timestamp()) \
+           is None
+
+
+def test_get_metar_record__data_exists__returns_record_with_the_requested_fields():
+    metar = orm.Metar(
+        id=uuid.uuid4().hex,
+        airport_icao='EHAM',
+        content={'wind_direction': {'value': 180}},
+        time=datetime.datetime(2022, 5, 30, 12),
+        created_at=datetime.datetime(2022, 5, 30, 11)
+    )
+    metar.save()
+    before_timestamp = int(datetime.datetime(2022, 5, 30, 12, 30).timestamp())
+
+    assert repo.get_metar_record('EHAM', before_timestamp) == MetarRecord(
+        id=metar.id,
+        airport_icao=metar.airport_icao,
+        content=metar.content,
+        time=metar.time,
+        created_at=metar.created_at
+    )
+    assert repo.get_metar_record('EHAM', before_timestamp, fields=('content',)) \
+           == MetarRecord(content=metar.content)
+
+
 @pytest.mark.parametrize('content, value_key, expected_value', [
     ({'key': {'value': 1}}, 'key', 1),
     ({'key': {'value': 1.2}}, 'key', 1.2),
@@ -458,3 +515,62 @@ def test_get_last_taf_end_time(taf_objects, expected_last_taf_end_time):
     [taf.save() for taf in taf_objects]
 
     assert repo.get_last_taf_end_time('EHAM') == expected_last_taf_end_time
+
+
+def _timestamp(datetime_string: str) -> int:
+    return int(datetime_from_string(datetime_string).timestamp())
+
+
+def test_iter_metars__streams_the_metars_within_the_range_in_chronological_order(
+        all_metar_data
+):
+    for metar_data in reversed(all_metar_data):
+        repo.add_metar(metar_data=metar_data, airport_icao='EHAM')
+    repo.add_metar(metar_data=all_metar_data[0], airport_icao='EBBR')
+
+    start_timestamp = _timestamp(all_metar_data[1]['time']['dt'])
+    end_timestamp = _timestamp(all_metar_data[-1]['time']['dt'])
+
+    metars = list(repo.iter_metars('EHAM', start_timestamp, end_timestamp, batch_size=2))
+
+    expected = [
+        metar_data for metar_data in all_metar_data
+        if start_timestamp <= _timestamp(metar_data['time']['dt']) < end_timestamp
+    ]
+    assert [metar.content for metar in metars] == expected
+
+
+def test_iter_metars__chunked__yields_lists_of_chunk_size(all_metar_data):
+    for metar_data in all_metar_data:
+        repo.add_metar(metar_data=metar_data, airport_icao='EHAM')
+
+    chunks = list(repo.iter_metars('EHAM', 0, get_current_timestamp(), chunk_size=4))
+
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+
+
+def test_iter_metars__with_fields__only_loads_those_fields(all_metar_data):
+    repo.add_metar(metar_data=all_metar_data[0], airport_icao='EHAM')
+
+    [metar] = repo.iter_metars('EHAM', 0, get_current_timestamp(), fields=('time',))
+
+    assert metar.time == datetime_from_string(all_metar_data[0]['time']['dt'])
+    assert metar.content == {}
+
+
+def test_iter_tafs__streams_the_tafs_overlapping_the_range_in_order_of_creation(all_taf_data):
+    for taf_data in all_taf_data:
+        repo.add_taf(taf_data=taf_data, airport_icao='EHAM')
+
+    start_timestamp = _timestamp('2022-03-19T18:00:00Z')
+    end_timestamp = _timestamp('2022-03-19T20:00:00Z')
+
+    tafs = list(repo.iter_tafs('EHAM', start_timestamp, end_timestamp, chunk_size=3))
+
+    expected = [
+        taf_data for taf_data in sorted(all_taf_data, key=lambda t: t['meta']['timestamp'])
+        if _timestamp(taf_data['start_time']['dt']) < end_timestamp
+        and _timestamp(taf_data['end_time']['dt']) >= start_timestamp
+    ]
+    assert expected
+    assert [taf.content for chunk in tafs for taf in chunk] == expected
@@ -0,0 +1,337 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import datetime
+import json
+import uuid
+from unittest import mock
+
+import pytest
+
+from met_update_db import sqlite_repo
+from met_update_db.read_models import TafRecord, MetarRecord
+from met_update_db.utils import datetime_from_string, datetime_from_string_with_ms
+from met_update_db.wind import WindData, WindDataSource, METNotAvailable, _get_wind_value
+
+
+@pytest.fixture(autouse=True)
+def setup_mongodb():
+    # overrides the conftest fixture: no MongoDB is needed here
+    yield
+
+
+@pytest.fixture(autouse=True)
+def setup_sqlite(tmp_path):
+    sqlite_repo.connect(tmp_path / 'met-update.db')
+    yield
+    sqlite_repo.close()
+
+
+def get_current_timestamp():
+    return int(datetime.datetime.utcnow().timestamp())
+
+
+def _insert_taf(start_time, end_time, created_at, content=None, airport_icao='EHAM') -> TafRecord:
+    taf = TafRecord(
+        id=uuid.uuid4(),
+        airport_icao=airport_icao,
+        content=content or {'meta': {}},
+        start_time=start_time,
+        end_time=end_time,
+        created_at=created_at
+    )
+    sqlite_repo._connection().execute(
+        'INSERT INTO taf (id, airport_icao, start_time, end_time, created_at, content) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        (taf.id.hex, taf.airport_icao, sqlite_repo._to_text(start_time),
+         sqlite_repo._to_text(end_time), sqlite_repo._to_text(created_at),
+         json.dumps(taf.content))
+    )
+    return taf
+
+
+def _insert_metar(time, created_at, content=None, airport_icao='EHAM') -> MetarRecord:
+    metar = MetarRecord(
+        id=uuid.uuid4(),
+        airport_icao=airport_icao,
+        content=content or {'meta': {}},
+        time=time,
+        created_at=created_at
+    )
+    sqlite_repo._connection().execute(
+        'INSERT INTO metar (id, airport_icao, time, created_at, wind_direction, wind_speed, '
+        'content) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        (metar.id.hex, metar.airport_icao, sqlite_repo._to_text(time),
+         sqlite_repo._to_text(created_at),
+         _get_wind_value(metar.content, 'wind_direction'),
+         _get_wind_value(metar.content, 'wind_speed'),
+         json.dumps(metar.content))
+    )
+    return metar
+
+
+def _two_tafs():
+    return [
+        _insert_taf(start_time=datetime.datetime(2022, 5, 30, 12),
+                    end_time=datetime.datetime(2022, 5, 30, 22),
+                    created_at=datetime.datetime(2022, 5, 30, 11)),
+        _insert_taf(start_time=datetime.datetime(2022, 5, 31, 12),
+                    end_time=datetime.datetime(2022, 5, 31, 22),
+                    created_at=datetime.datetime(2022, 5, 31, 11)),
+    ]
+
+
+def _two_metars():
+    return [
+        _insert_metar(time=datetime.datetime(2022, 5, 30, 12),
+                      created_at=datetime.datetime(2022, 5, 30, 11)),
+        _insert_metar(time=datetime.datetime(2022, 5, 31, 12),
+                      created_at=datetime.datetime(2022, 5, 31, 11)),
+    ]
+
+
+def test_add_taf(sample_taf_data):
+    sqlite_repo.add_taf(taf_data=sample_taf_data, airport_icao='EHAM')
+
+    [taf] = sqlite_repo._connection().execute(
+        'SELECT content, start_time, end_time, created_at FROM taf').fetchall()
+    assert json.loads(taf[0]) == sample_taf_data
+    assert sqlite_repo._from_text(taf[1]) \
+           == datetime_from_string(sample_taf_data['start_time']['dt'])
+    assert sqlite_repo._from_text(taf[2]) \
+           == datetime_from_string(sample_taf_data['end_time']['dt'])
+    assert sqlite_repo._from_text(taf[3]) \
+           == datetime_from_string_with_ms(sample_taf_data['meta']['timestamp'])
+
+
+def test_add_metar(sample_metar_data):
+    sqlite_repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+
+    [metar] = sqlite_repo._connection().execute(
+        'SELECT content, time, created_at, wind_direction, wind_speed FROM metar').fetchall()
+    assert json.loads(metar[0]) == sample_metar_data
+    assert sqlite_repo._from_text(metar[1]) \
+           == datetime_from_string(sample_metar_data['time']['dt'])
+    assert sqlite_repo._from_text(metar[2]) \
+           == datetime_from_string_with_ms(sample_metar_data['meta']['timestamp'])
+    assert metar[3:] == (sample_metar_data['wind_direction']['value'],
+                         sample_metar_data['wind_speed']['value'])
+
+
+def test_get_taf__no_data__returns_none():
+    assert sqlite_repo.get_taf(airport_icao='EHAM', before_timestamp=get_current_timestamp()) \
+           is None
+
+
+@pytest.mark.parametrize('airport_icao, before_timestamp', [
+    ('EHAM', int(datetime.datetime(2022, 6, 1, 18).timestamp())),
+    ('EBBR', int(datetime.datetime(2022, 5, 30, 18).timestamp())),
+])
+def test_get_taf__data_exists__does_not_satisfy_query__returns_none(
+        airport_icao, before_timestamp
+):
+    _two_tafs()
+
+    assert sqlite_repo.get_taf(airport_icao, before_timestamp) is None
+
+
+def test_get_taf__data_exists__satisfies_the_query__returns_taf():
+    taf = _two_tafs()
+
+    assert sqlite_repo.get_taf(
+        airport_icao='EHAM',
+        before_timestamp=int(datetime.datetime(2022, 5, 30, 18).timestamp())
+    ) == taf[0]
+
+
+def test_get_taf__unknown_field__raises_valueerror():
+    with pytest.raises(ValueError):
+        sqlite_repo.get_taf('EHAM', 0, fields=('content; DROP TABLE taf',))
+
+
+def test_get_metar__no_data__returns_none():
+    assert sqlite_repo.get_metar(airport_icao='EHAM', before_timestamp=get_current_timestamp()) \
+           is None
+
+
+@pytest.mark.parametrize('airport_icao, before_timestamp', [
+    ('EHAM', int(datetime.datetime(2022, 5, 30, 15).timestamp())),
+    ('EHAM', int(datetime.datetime(2022, 6, 1, 18).timestamp())),
+    ('EBBR', int(datetime.datetime(2022, 5, 30, 18).timestamp())),
+])
+def test_get_metar__data_exists__does_not_satisfy_query__returns_none(
+        airport_icao, before_timestamp
+):
+    _two_metars()
+
+    assert sqlite_repo.get_metar(airport_icao, before_timestamp) is None
+
+
+def test_get_metar__data_exists__satisfies_the_query__returns_metar():
+    metar = _two_metars()
+
+    assert sqlite_repo.get_metar(
+        airport_icao='EHAM',
+        before_timestamp=int(datetime.datetime(2022, 5, 30, 12, 30).timestamp())
+    ) == metar[0]
+
+
+def test_get_metar_wind_data__no_metar_found__returns_none():
+    assert sqlite_repo.get_metar_wind_data('EHAM', before_timestamp=get_current_timestamp()) \
+           is None
+
+
+@pytest.mark.parametrize('content, expected_wind_data', [
+    ({'wind_direction': {'value': None}, 'wind_speed': {'value': 10}}, None),
+    ({'wind_direction': {'value': 180}, 'wind_speed': {'value': None}}, None),
+    ({'wind_direction': {'value': 180}, 'wind_speed': {'value': 10}},
+     WindData(direction=180, speed=10)),
+])
+def test_get_metar_wind_data(content, expected_wind_data):
+    _insert_metar(time=datetime.datetime(2022, 5, 30, 12),
+                  created_at=datetime.datetime(2022, 5, 30, 11),
+                  content=content)
+
+    assert sqlite_repo.get_metar_wind_data(
+        'EHAM', before_timestamp=int(datetime.datetime(2022, 5, 30, 12, 30).timestamp())
+    ) == expected_wind_data
+
+
+def test_get_taf_wind_data__no_taf_is_found__returns_none():
+    assert sqlite_repo.get_taf_wind_data('EHAM', before_timestamp=get_current_timestamp()) \
+           is None
+
+
+@pytest.mark.parametrize('wind_direction, wind_speed, expected_wind_data', [
+    (None, None, None),
+    (None, 10, None),
+    (180, None, None),
+    (180, 10, WindData(direction=180, speed=10)),
+])
+def test_get_taf_wind_data(wind_direction, wind_speed, expected_wind_data):
+    _insert_taf(start_time=datetime.datetime(2022, 5, 30, 12),
+                end_time=datetime.datetime(2022, 5, 30, 22),
+                created_at=datetime.datetime(2022, 5, 30, 11),
+                content={'forecast': [{
+                    'start_time': {'dt': '2022-05-30T12:00:00Z'},
+                    'end_time': {'dt': '2022-05-30T22:00:00Z'},
+                    'wind_direction': {'value': wind_direction},
+                    'wind_speed': {'value': wind_speed},
+                }]})
+
+    assert sqlite_repo.get_taf_wind_data(
+        'EHAM', before_timestamp=int(datetime.datetime(2022, 5, 30, 18).timestamp())
+    ) == expected_wind_data
+
+
+@mock.patch('met_update_db.sqlite_repo.get_taf_wind_data')
+@mock.patch('met_update_db.sqlite_repo.get_metar_wind_data')
+def test_get_wind_data__no_data_available__raises_metnotavailable(
+        mock_get_metar_wind_data,
+        mock_get_taf_wind_data,
+):
+    mock_get_metar_wind_data.return_value = None
+    mock_get_taf_wind_data.return_value = None
+
+    with pytest.raises(METNotAvailable):
+        sqlite_repo.get_wind_data('EHAM', before_timestamp=get_current_timestamp())
+
+
+@pytest.mark.parametrize('metar_wind_data, taf_wind_data, expected_result', [
+    (
+            WindData(direction=180, speed=10),
+            None,
+            (WindData(direction=180, speed=10), WindDataSource.METAR)
+    ),
+    (
+            WindData(direction=180, speed=10),
+            WindData(direction=100, speed=8),
+            (WindData(direction=180, speed=10), WindDataSource.METAR)
+    ),
+    (
+            None,
+            WindData(direction=180, speed=10),
+            (WindData(direction=180, speed=10), WindDataSource.TAF)
+    ),
+])
+@mock.patch('met_update_db.sqlite_repo.get_taf_wind_data')
+@mock.patch('met_update_db.sqlite_repo.get_metar_wind_data')
+def test_get_wind_data(
+        mock_get_metar_wind_data,
+        mock_get_taf_wind_data,
+        metar_wind_data,
+        taf_wind_data,
+        expected_result
+):
+    mock_get_metar_wind_data.return_value = metar_wind_data
+    mock_get_taf_wind_data.return_value = taf_wind_data
+
+    assert sqlite_repo.get_wind_data('EHAM', before_timestamp=get_current_timestamp()) \
+        == expected_result
+
+
+def test_get_wind_data__sample_reports(all_metar_data, all_taf_data):
+    for metar_data in all_metar_data:
+        sqlite_repo.add_metar(metar_data=metar_data, airport_icao='EHAM')
+    for taf_data in all_taf_data:
+        sqlite_repo.add_taf(taf_data=taf_data, airport_icao='EHAM')
+
+    metar_data = all_metar_data[0]
+    before_timestamp = int(
+        datetime_from_string_with_ms(metar_data['meta']['timestamp']).timestamp()) + 1
+
+    assert sqlite_repo.get_wind_data('EHAM', before_timestamp) == (
+        WindData(direction=metar_data['wind_direction']['value'],
+                 speed=metar_data['wind_speed']['value']),
+        WindDataSource.METAR
+    )
+
+
+def test_get_last_taf_end_time__no_taf_available__raises_metnotavailable():
+    with pytest.raises(METNotAvailable):
+        sqlite_repo.get_last_taf_end_time('EHAM')
+
+
+def test_get_last_taf_end_time():
+    _insert_taf(start_time=datetime.datetime(2022, 5, 30, 12),
+                end_time=datetime.datetime(2022, 5, 30, 22),
+                created_at=datetime.datetime(2022, 5, 30, 11))
+    _insert_taf(start_time=datetime.datetime(2022, 6, 30, 12),
+                end_time=datetime.datetime(2022, 6, 30, 22),
+                created_at=datetime.datetime(2022, 6, 30, 11))
+
+    assert sqlite_repo.get_last_taf_end_time('EHAM') == datetime.datetime(2022, 6, 30, 22)
@@ -0,0 +1,225 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+from unittest import mock
+
+import pytest
+from mongoengine import connection
+
+from met_update_db import repo, timeline, pymongo_repo
+from met_update_db.timeline import SLOT_SECONDS
+from met_update_db.utils import datetime_from_string
+
+
+@pytest.fixture
+def enable_timeline():
+    timeline.enable(connection.get_db())
+    yield
+    timeline.disable(connection.get_db())
+
+
+def _slot_count() -> int:
+    return connection.get_db()[timeline.TIMELINE_COLLECTION].count_documents({})
+
+
+def _timestamp(value: str) -> int:
+    return int(datetime_from_string(value).timestamp())
+
+
+def _lookup(airport_icao: str, timestamp: int):
+    try:
+        return timeline.get_wind_data(connection.get_db(), airport_icao, timestamp)
+    except repo.METNotAvailable:
+        return None
+
+
+def _timestamps() -> list[int]:
+    # every 61 seconds around the METARs and every 1237 seconds over the first TAF, so that the
+    # lookups fall all over the slots
+    return list(range(_timestamp('2022-03-18T12:00:00Z'), _timestamp('2022-03-18T20:00:00Z'), 61)) \
+        + list(range(_timestamp('2022-03-18T20:00:00Z'), _timestamp('2022-03-19T19:00:00Z'), 1237))
+
+
+@pytest.fixture
+def all_reports(all_taf_data, all_metar_data):
+    for taf_data in all_taf_data:
+        repo.add_taf(taf_data=taf_data, airport_icao='EHAM')
+    for metar_data in all_metar_data:
+        repo.add_metar(metar_data=metar_data, airport_icao='EHAM')
+
+
+def test_slot_timestamp():
+    assert timeline.slot_timestamp(SLOT_SECONDS * 10) == SLOT_SECONDS * 10
+    assert timeline.slot_timestamp(SLOT_SECONDS * 10 + 1) == SLOT_SECONDS * 10
+    assert timeline.slot_timestamp(SLOT_SECONDS * 11 - 1) == SLOT_SECONDS * 10
+
+
+def test_get_wind_data__no_slot__returns_none():
+    assert timeline.get_wind_data(connection.get_db(), 'EHAM', before_timestamp=0) is None
+
+
+def test_add_reports__timeline_enabled__lookups_match_the_resolved_wind(enable_timeline,
+                                                                        all_reports):
+    resolved = [repo.resolve_wind_data('EHAM', timestamp) for timestamp in _timestamps()]
+
+    assert [_lookup('EHAM', timestamp) for timestamp in _timestamps()] == resolved
+    assert {source for _, source in filter(None, resolved)} \
+           == {repo.WindDataSource.METAR, repo.WindDataSource.TAF}
+
+
+def test_get_wind_data__within_the_slot_of_a_new_metar__matches_the_resolved_wind(
+        enable_timeline, sample_metar_data
+):
+    repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+    # the METAR is created at 13:00:04 within the 13:00 slot
+    timestamp = _timestamp('2022-03-18T13:01:00Z')
+
+    assert _lookup('EHAM', timestamp - 60) is None
+    assert _lookup('EHAM', timestamp) == repo.resolve_wind_data('EHAM', timestamp) is not None
+
+
+def test_add_taf__timeline_enabled__does_not_resolve_every_slot(enable_timeline,
+                                                                sample_taf_data):
+    with mock.patch.object(repo, 'resolve_wind_data') as mock_resolve_wind_data, \
+            mock.patch.object(repo, 'get_taf') as mock_get_taf:
+        repo.add_taf(taf_data=sample_taf_data, airport_icao='EHAM')
+
+    mock_resolve_wind_data.assert_not_called()
+    mock_get_taf.assert_not_called()
+    assert _slot_count() > 0
+
+
+def test_get_wind_data__timeline_enabled__is_answered_from_the_timeline(
+        enable_timeline, sample_metar_data
+):
+    repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+    timestamp = _timestamp('2022-03-18T13:30:00Z')
+
+    with mock.patch.object(repo, 'resolve_wind_data') as mock_resolve_wind_data:
+        result = repo.get_wind_data('EHAM', timestamp)
+
+    mock_resolve_wind_data.assert_not_called()
+    assert result == timeline.get_wind_data(connection.get_db(), 'EHAM', timestamp)
+
+
+def test_enable__rebuilds_the_slots_of_the_stored_reports(sample_metar_data):
+    repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+    timestamp = _timestamp('2022-03-18T13:30:00Z')
+
+    timeline.enable(connection.get_db())
+    try:
+        with mock.patch.object(repo, 'resolve_wind_data') as mock_resolve_wind_data:
+            result = repo.get_wind_data('EHAM', timestamp)
+
+        mock_resolve_wind_data.assert_not_called()
+        assert result == _lookup('EHAM', timestamp) is not None
+    finally:
+        timeline.disable(connection.get_db())
+
+    assert _slot_count() == 0
+
+
+def test_get_wind_data__missing_slot__falls_back_to_the_reports(enable_timeline,
+                                                                sample_metar_data):
+    repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+    timestamp = _timestamp('2022-03-18T13:30:00Z')
+    connection.get_db()[timeline.TIMELINE_COLLECTION].delete_many({})
+
+    assert repo.get_wind_data('EHAM', timestamp) == repo.resolve_wind_data('EHAM', timestamp)
+
+
+def test_add_metar__enabled_by_another_process__refreshes_the_slots(sample_metar_data):
+    # only the state stored in the database, as `timeline.enable` run elsewhere leaves it
+    connection.get_db()[timeline.STATE_COLLECTION].insert_one(
+        {'_id': timeline.STATE_ID, 'enabled': True}
+    )
+
+    repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+
+    assert _slot_count() > 0
+
+
+def test_pymongo_repo_add_reports__timeline_enabled__lookups_match_the_resolved_wind(
+        enable_timeline, all_taf_data, all_metar_data
+):
+    pymongo_repo.use_database(connection.get_db())
+    try:
+        for taf_data in all_taf_data:
+            pymongo_repo.add_taf(taf_data=taf_data, airport_icao='EHAM')
+        for metar_data in all_metar_data:
+            pymongo_repo.add_metar(metar_data=metar_data, airport_icao='EHAM')
+    finally:
+        pymongo_repo.use_database(None)
+
+    assert [_lookup('EHAM', timestamp) for timestamp in _timestamps()] \
+           == [repo.resolve_wind_data('EHAM', timestamp) for timestamp in _timestamps()]
+
+
+def test_rebuild(all_reports):
+    assert _slot_count() == 0
+
+    timeline.rebuild(connection.get_db())
+
+    assert [_lookup('EHAM', timestamp) for timestamp in _timestamps()] \
+           == [repo.resolve_wind_data('EHAM', timestamp) for timestamp in _timestamps()]
+
+
+def test_refresh__older_read_written_last__does_not_replace_the_newer_slots(
+        enable_timeline, all_metar_data
+):
+    read_reports = timeline._overlapping_reports
+    interleaved = []
+
+    def read_then_interleave(*args):
+        reports = read_reports(*args)
+
+        # another writer stores, reads and writes its slots before this refresh writes its own
+        if not interleaved:
+            interleaved.append(True)
+            repo.add_metar(metar_data=all_metar_data[1], airport_icao='EHAM')
+
+        return reports
+
+    with mock.patch.object(timeline, '_overlapping_reports', side_effect=read_then_interleave):
+        repo.add_metar(metar_data=all_metar_data[0], airport_icao='EHAM')
+
+    timestamps = range(_timestamp(all_metar_data[0]['time']['dt']),
+                       _timestamp(all_metar_data[1]['time']['dt']) + 3 * 60 * 60, 61)
+    resolved = [repo.resolve_wind_data('EHAM', timestamp) for timestamp in timestamps]
+
+    assert interleaved
+    assert [_lookup('EHAM', timestamp) for timestamp in timestamps] == resolved
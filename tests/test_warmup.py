@@ -0,0 +1,89 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import pytest
+
+from met_update_db import repo, warmup
+from met_update_db.utils import datetime_from_string_with_ms
+from met_update_db.wind_table import WindTableWriter, WindTableReader
+
+
+@pytest.fixture
+def reset_ready():
+    yield
+    warmup._ready.clear()
+
+
+@pytest.fixture
+def reports(all_metar_data, all_taf_data):
+    for airport_icao in ('EHAM', 'EBBR'):
+        for metar_data in all_metar_data:
+            repo.add_metar(metar_data=metar_data, airport_icao=airport_icao)
+    for taf_data in all_taf_data:
+        repo.add_taf(taf_data=taf_data, airport_icao='EHAM')
+
+
+def test_warm_up__all_airports(reports, reset_ready):
+    assert not warmup.is_ready()
+
+    report = warmup.warm_up()
+
+    assert (report.metars, report.tafs, report.airports_without_data) == (2, 1, [])
+    assert warmup.is_ready()
+    assert warmup.wait_until_ready(timeout=0)
+
+
+def test_warm_up__selected_airports(reports, reset_ready):
+    report = warmup.warm_up(['EBBR', 'LFPG'])
+
+    assert (report.metars, report.tafs, report.airports_without_data) == (1, 0, ['LFPG'])
+
+
+def test_warm_up__populates_the_wind_table(reports, reset_ready, tmp_path, all_taf_data):
+    writer = WindTableWriter(tmp_path / 'wind-table', capacity=8)
+    reader = WindTableReader(tmp_path / 'wind-table')
+
+    warmup.warm_up(wind_table_writer=writer)
+
+    latest_taf_created_at = max(
+        datetime_from_string_with_ms(taf_data['meta']['timestamp']) for taf_data in all_taf_data
+    )
+    before_timestamp = int(latest_taf_created_at.timestamp()) + 60
+    result = reader.lookup('EHAM', before_timestamp)
+
+    assert result is not None
+    assert result == repo.resolve_wind_data('EHAM', before_timestamp)
@@ -0,0 +1,110 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from met_update_db.wind import WindData
+from met_update_db.wind_components import wind_components, wind_data_components
+
+
+@pytest.mark.parametrize('direction, runway_heading, expected_headwind, expected_tailwind, '
+                         'expected_crosswind', [
+    (270, 270, 10, 0, 0),
+    (90, 270, 0, 10, 0),
+    (360, 270, 0, 0, 10),
+    (180, 270, 0, 0, -10),
+    (300, 270, 10 * np.cos(np.radians(30)), 0, 10 * np.sin(np.radians(30))),
+    (10, 350, 10 * np.cos(np.radians(20)), 0, 10 * np.sin(np.radians(20))),
+])
+def test_wind_components(direction, runway_heading, expected_headwind, expected_tailwind,
+                         expected_crosswind):
+    components = wind_components([direction], [10], [runway_heading])
+
+    np.testing.assert_allclose(components.headwind, [[expected_headwind]], atol=1e-9)
+    np.testing.assert_allclose(components.tailwind, [[expected_tailwind]], atol=1e-9)
+    np.testing.assert_allclose(components.crosswind, [[expected_crosswind]], atol=1e-9)
+
+
+def test_wind_components__every_observation_on_every_runway():
+    components = wind_components(np.array([270., 90., 180.]), np.array([10., 5., 8.]),
+                                 [270, 90])
+
+    assert components.headwind.shape == components.tailwind.shape \
+           == components.crosswind.shape == (3, 2)
+    np.testing.assert_allclose(components.headwind, [[10, 0], [0, 5], [0, 0]], atol=1e-9)
+    np.testing.assert_allclose(components.tailwind, [[0, 10], [5, 0], [0, 0]], atol=1e-9)
+    np.testing.assert_allclose(components.crosswind, [[0, 0], [0, 0], [-8, 8]], atol=1e-9)
+
+
+def test_wind_components__missing_values__are_nan():
+    components = wind_components([None, 270, np.nan], [10, None, 10], [270])
+
+    assert np.isnan(components.headwind).all()
+    assert np.isnan(components.tailwind).all()
+    assert np.isnan(components.crosswind).all()
+
+
+def test_wind_components__non_numeric_values__are_nan():
+    components = wind_components(['VRB', '270', 300], np.array(['10', 'x', '5'], dtype=object),
+                                 [270])
+
+    assert np.isnan(components.headwind[:2]).all()
+    np.testing.assert_allclose(components.headwind[2], [5 * np.cos(np.radians(30))])
+
+
+def test_wind_components__numeric_arrays__are_converted_without_a_python_loop():
+    directions = np.array([270., 90.])
+
+    with mock.patch('met_update_db.wind_components._to_float') as mock_to_float:
+        wind_components(directions, np.array([10, 5]), [270])
+
+    mock_to_float.assert_not_called()
+
+
+def test_wind_components__different_lengths__raises_valueerror():
+    with pytest.raises(ValueError):
+        wind_components([270, 90], [10], [270])
+
+
+def test_wind_data_components():
+    components = wind_data_components([WindData(direction=270, speed=10), None], [270])
+
+    np.testing.assert_allclose(components.headwind[0], [10])
+    assert np.isnan(components.headwind[1]).all()
@@ -0,0 +1,289 @@
+"""
+Copyright 2022 EUROCONTROL
+==========================================
+
+Redistribution and use in source and binary forms, with or without modification, are permitted
+provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, this list of conditions
+   and the following disclaimer.
+2. Redistributions in binary form must reproduce the above copyright notice, this list of
+conditions
+   and the following disclaimer in the documentation and/or other materials provided with the
+   distribution.
+3. Neither the name of the copyright holder nor the names of its contributors may be used to
+endorse
+   or promote products derived from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR
+IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER
+IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT
+OF
+THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+==========================================
+
+Editorial note: this license is an instance of the BSD license template as provided by the Open
+Source Initiative: http://opensource.org/licenses/BSD-3-Clause
+
+Details on EUROCONTROL: http://www.eurocontrol.int
+"""
+
+__author__ = "EUROCONTROL (SWIM)"
+
+import datetime
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from met_update_db import repo, wind_table
+from met_update_db.utils import datetime_from_string_with_ms
+from met_update_db.wind import WindData, WindDataSource
+from met_update_db.wind_table import WindTableWriter, WindTableReader
+
+
+def _metar(time: datetime.datetime, direction, speed) -> dict:
+    return {
+        'time': time,
+        'created_at': time.strftime("%Y,%m,%d,%H,%M,%S,%f"),
+        'content': {'wind_direction': {'value': direction}, 'wind_speed': {'value': speed}},
+    }
+
+
+def _taf(start_time: datetime.datetime, end_time: datetime.datetime, forecast: list) -> dict:
+    return {
+        'start_time': start_time,
+        'end_time': end_time,
+        'created_at': start_time.strftime("%Y,%m,%d,%H,%M,%S,%f"),
+        'content': {'forecast': forecast},
+    }
+
+
+def _forecast_item(start_time: str, end_time: str, direction, speed) -> dict:
+    return {
+        'start_time': {'dt': start_time},
+        'end_time': {'dt': end_time},
+        'wind_direction': {'value': direction},
+        'wind_speed': {'value': speed},
+    }
+
+
+def _ts(*args) -> int:
+    return int(datetime.datetime(*args).timestamp())
+
+
+@pytest.fixture
+def table_path(tmp_path):
+    return tmp_path / 'wind-table'
+
+
+@pytest.fixture
+def writer(table_path):
+    writer = WindTableWriter(table_path, capacity=8)
+    writer.mark_refreshed(time.time())
+    yield writer
+    writer.close()
+
+
+@pytest.fixture
+def reader(writer, table_path):
+    reader = WindTableReader(table_path)
+    yield reader
+    reader.close()
+
+
+def test_lookup__unknown_airport__returns_none(reader):
+    assert reader.lookup('EHAM', _ts(2022, 5, 30, 12)) is None
+
+
+def test_lookup__latest_metar_within_two_hours__returns_metar_wind(writer, reader):
+    writer.write('EHAM', metar=_metar(datetime.datetime(2022, 5, 30, 12), 180, 10), taf=None)
+
+    assert reader.lookup('EHAM', _ts(2022, 5, 30, 13)) \
+           == (WindData(direction=180, speed=10), WindDataSource.METAR)
+    # before the creation of the latest METAR
+    assert reader.lookup('EHAM', _ts(2022, 5, 30, 11)) is None
+    with pytest.raises(repo.METNotAvailable):
+        reader.lookup('EHAM', _ts(2022, 5, 30, 15))
+
+
+def test_lookup__metar_not_available__resolves_taf_forecast_items(writer, reader):
+    writer.write(
+        'EHAM',
+        metar=_metar(datetime.datetime(2022, 5, 30, 6), 180, 10),
+        taf=_taf(datetime.datetime(2022, 5, 30, 12), datetime.datetime(2022, 5, 31, 12), [
+            _forecast_item('2022-05-30T12:00:00Z', '2022-05-30T18:00:00Z', 90, 5),
+            _forecast_item('2022-05-30T18:00:00Z', '2022-05-31T12:00:00Z', None, 7),
+        ])
+    )
+
+    assert reader.lookup('EHAM', _ts(2022, 5, 30, 14)) \
+           == (WindData(direction=90, speed=5), WindDataSource.TAF)
+    assert reader.lookup('EHAM', _ts(2022, 5, 30, 20)) \
+           == (WindData(direction=90, speed=7), WindDataSource.TAF)
+    # the latest TAF is not valid yet, an older one might be
+    assert reader.lookup('EHAM', _ts(2022, 5, 30, 10)) is None
+
+
+def test_write__forecast_item_without_wind_nor_times__is_skipped(writer, reader):
+    writer.write(
+        'EHAM',
+        metar=None,
+        taf=_taf(datetime.datetime(2022, 5, 30, 12), datetime.datetime(2022, 5, 31, 12), [
+            {'visibility': {'value': 9999}},
+            _forecast_item('2022-05-30T12:00:00Z', '2022-05-31T12:00:00Z', 90, 5),
+        ])
+    )
+
+    assert reader.lookup('EHAM', _ts(2022, 5, 30, 14)) \
+           == (WindData(direction=90, speed=5), WindDataSource.TAF)
+
+
+def test_write__existing_airport__overwrites_its_slot(writer, reader):
+    writer.write('EHAM', metar=_metar(datetime.datetime(2022, 5, 30, 12), 180, 10), taf=None)
+    writer.write('EHAM', metar=_metar(datetime.datetime(2022, 5, 30, 13), 200, 12), taf=None)
+
+    assert reader.lookup('EHAM', _ts(2022, 5, 30, 13, 30)) \
+           == (WindData(direction=200, speed=12), WindDataSource.METAR)
+
+
+def test_write__table_is_full__raises_valueerror(writer):
+    for i in range(8):
+        writer.write(f"EH{i:02}", metar=None, taf=None)
+
+    with pytest.raises(ValueError):
+        writer.write('EHAM', metar=None, taf=None)
+
+
+def test_lookup__concurrent_writer__never_returns_torn_values(writer, reader):
+    stop = threading.Event()
+
+    def write():
+        speed = 0
+        while not stop.is_set():
+            speed += 1
+            writer.write('EHAM', metar=_metar(datetime.datetime(2022, 5, 30, 12), speed, speed),
+                         taf=None)
+
+    writer_thread = threading.Thread(target=write)
+    writer_thread.start()
+    try:
+        for _ in range(5000):
+            result = reader.lookup('EHAM', _ts(2022, 5, 30, 13))
+            if result is not None:
+                wind_data, _ = result
+                assert wind_data.direction == wind_data.speed
+    finally:
+        stop.set()
+        writer_thread.join()
+
+
+def test_refresh__lookups_match_the_database(writer, table_path, all_metar_data, all_taf_data):
+    for metar_data in all_metar_data:
+        repo.add_metar(metar_data=metar_data, airport_icao='EHAM')
+    for taf_data in all_taf_data:
+        repo.add_taf(taf_data=taf_data, airport_icao='EHAM')
+    writer.refresh('EHAM')
+
+    latest_created_at = max(
+        datetime_from_string_with_ms(data['meta']['timestamp'])
+        for data in all_metar_data + all_taf_data
+    )
+    start_timestamp = int(latest_created_at.timestamp()) + 1
+
+    wind_table.attach(table_path)
+    try:
+        answered = 0
+        for before_timestamp in range(start_timestamp, start_timestamp + 2 * 86400, 1800):
+            result = wind_table.lookup('EHAM', before_timestamp)
+            if result is not None:
+                assert result == repo.resolve_wind_data('EHAM', before_timestamp)
+                answered += 1
+    finally:
+        wind_table.detach()
+
+    assert answered
+
+
+def test_lookup__stale_table__returns_none(writer, reader):
+    writer.write('EHAM', metar=_metar(datetime.datetime(2022, 5, 30, 12), 180, 10), taf=None)
+
+    writer.mark_refreshed(time.time() - writer.max_age_seconds - 1)
+
+    assert reader.lookup('EHAM', _ts(2022, 5, 30, 13)) is None
+    assert reader.lookup('EHAM', _ts(2022, 5, 30, 15)) is None
+
+
+def test_lookup__never_refreshed__returns_none(table_path):
+    writer = WindTableWriter(table_path, capacity=8)
+    writer.write('EHAM', metar=_metar(datetime.datetime(2022, 5, 30, 12), 180, 10), taf=None)
+    reader = WindTableReader(table_path)
+
+    try:
+        assert reader.lookup('EHAM', _ts(2022, 5, 30, 13)) is None
+    finally:
+        reader.close()
+        writer.close()
+
+
+class _StopUpdater(Exception):
+    pass
+
+
+def test_run_updater__refreshes_the_airports_of_late_reports(writer, reader, sample_metar_data):
+    repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+    # stored years after its creation, while the updater sleeps
+    sleeps = [lambda: repo.add_metar(metar_data=sample_metar_data, airport_icao='EBBR'),
+              lambda: None]
+
+    def sleep(_):
+        if not sleeps:
+            raise _StopUpdater()
+        sleeps.pop(0)()
+
+    with mock.patch('met_update_db.wind_table.time.sleep', side_effect=sleep), \
+            pytest.raises(_StopUpdater):
+        wind_table.run_updater(writer, interval_seconds=30)
+
+    before_timestamp = int(
+        datetime_from_string_with_ms(sample_metar_data['meta']['timestamp']).timestamp()) + 60
+    assert reader.lookup('EBBR', before_timestamp) \
+           == repo.resolve_wind_data('EBBR', before_timestamp) is not None
+
+
+def test_run_updater__passes_shorter_than_the_interval__table_never_goes_stale(
+        writer, reader, sample_metar_data
+):
+    repo.add_metar(metar_data=sample_metar_data, airport_icao='EHAM')
+    now = [time.time()]
+    stale = []
+    sleeps = []
+
+    def advance(seconds):
+        # checks the table every second of the simulated time
+        for _ in range(int(seconds)):
+            now[0] += 1
+            stale.append(reader.is_stale())
+
+    def sleep(seconds):
+        if len(sleeps) == 10:
+            raise _StopUpdater()
+        sleeps.append(seconds)
+        advance(seconds)
+
+    with mock.patch('met_update_db.wind_table.time.time', side_effect=lambda: now[0]), \
+            mock.patch('met_update_db.wind_table.time.sleep', side_effect=sleep), \
+            mock.patch('met_update_db.wind_table._airports_ingested_since',
+                       return_value={'EHAM'}), \
+            mock.patch.object(writer, 'refresh', side_effect=lambda _: advance(25)), \
+            pytest.raises(_StopUpdater):
+        wind_table.run_updater(writer, interval_seconds=30)
+
+    assert sleeps == [5] * 10
+    assert stale and not any(stale)